@@ -4,18 +4,21 @@ import board
 import usb_cdc
 import usb_hid
 import traceback # Import traceback for detailed error info
-import time
 
-# Make filesystem writable so we can create log files
-# storage.remount("/", readonly=False)
+from event_log import event_log
+from hid_descriptor import (REPORT_ID, USAGE_PAGE, USAGE, build_report_descriptor,
+                            get_layout, read_layout_setting, record_enabled_layout,
+                            report_length)
 
-def log_message(message):
+# Boot messages are collected in RAM and written to /log.txt in one go at the
+# end of boot.py, instead of opening the file for every line.
+def log_message(message, error=False):
+    event_log.log(message, error=error)
+
+def log_exception(e):
     try:
-        with open("/log.txt", "a") as f:
-            timestamp = time.monotonic()
-            f.write(f"[{timestamp:.3f}] {message}\n")
-    except Exception as e:
-        # If we can't write to the file, we can't do much about it
+        event_log.log("Traceback:\n" + "".join(traceback.format_exception(e)), error=True)
+    except Exception:
         pass
 
 log_message("Starting boot.py...")
@@ -24,30 +27,13 @@ log_message("Starting boot.py...")
 supervisor.runtime.autoreload = False # Ensure this is active
 log_message("Auto-reload disabled.") # Added debug output
 
-# --- XAC Gamepad Report Descriptor (moved back from code.py) ---
-XAC_GAMEPAD_REPORT_DESCRIPTOR = bytes((
-    0x05, 0x01,  # Usage Page (Generic Desktop Ctrls)
-    0x09, 0x05,  # Usage (GamePad)
-    0xA1, 0x01,  # Collection (Application)
-    0x85, 0x05,  #   Report ID (5)
-    0x05, 0x01,  #   Usage Page (Generic Desktop Ctrls)
-    0x09, 0x30,  #   Usage (X)
-    0x09, 0x31,  #   Usage (Y)
-    0x15, 0x00,  #   Logical Minimum (0)
-    0x26, 0xFF, 0x00,  #   Logical Maximum (255)
-    0x75, 0x08,  #   Report Size (8)
-    0x95, 0x02,  #   Report Count (2)
-    0x81, 0x02,  #   Input (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
-    0x05, 0x09,  #   Usage Page (Button)
-    0x19, 0x01,  #   Usage Minimum (0x01)
-    0x29, 0x08,  #   Usage Maximum (0x08)
-    0x15, 0x00,  #   Logical Minimum (0)
-    0x25, 0x01,  #   Logical Maximum (1)
-    0x75, 0x01,  #   Report Size (1)
-    0x95, 0x08,  #   Report Count (8)
-    0x81, 0x02,  #   Input (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
-    0xC0,        # End Collection
-))
+# --- XAC Gamepad Report Descriptor (generated from hid_descriptor.py) ---
+# The layout ("standard" or "extended") is read from settings.json at boot;
+# hid_xac_gamepad.Gamepad packs its reports from the same spec.
+hid_layout_name = read_layout_setting()
+hid_layout = get_layout(hid_layout_name)
+XAC_GAMEPAD_REPORT_DESCRIPTOR = build_report_descriptor(hid_layout)
+log_message(f"HID report layout: {hid_layout_name}")
 log_message("Report descriptor defined.") # Added debug output
 
 # --- Attempt HID Initialization in boot.py ---
@@ -55,24 +41,21 @@ try:
     log_message("Attempting to enable USB HID...")
     gamepad_device = usb_hid.Device(
         report_descriptor=XAC_GAMEPAD_REPORT_DESCRIPTOR,
-        usage_page=0x01,
-        usage=0x05,
-        report_ids=(5,),
-        in_report_lengths=(3,),
+        usage_page=USAGE_PAGE,
+        usage=USAGE,
+        report_ids=(REPORT_ID,),
+        in_report_lengths=(report_length(hid_layout),),
         out_report_lengths=(0,),
     )
     usb_hid.enable((gamepad_device,))
     log_message("USB HID enabled successfully.")
+    # code.py leest de layout hieruit, niet uit settings.json (die kan intussen gewijzigd zijn)
+    if not record_enabled_layout(hid_layout_name):
+        log_message("Could not record HID layout in nvm")
 except Exception as e: # Catch all exceptions for now
     error_msg = f"Error during USB HID initialization: {e}"
     log_message(error_msg)
-    try:
-        import traceback
-        with open("/log.txt", "a") as f:
-            f.write("Traceback:\n")
-            traceback.print_exception(e, file=f)
-    except:
-        pass
+    log_exception(e)
 
 # Enable USB CDC for console and data (after HID attempt)
 try:
@@ -81,12 +64,7 @@ try:
 except Exception as e:
     error_msg = f"Error enabling USB CDC: {e}"
     log_message(error_msg)
-    try:
-        import traceback
-        with open("/log.txt", "a") as f:
-            f.write("Traceback:\n")
-            traceback.print_exception(e, file=f)
-    except:
-        pass
+    log_exception(e)
 
 log_message("Boot complete - CDC enabled, HID status logged above.")
+event_log.flush()
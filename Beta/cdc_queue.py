@@ -0,0 +1,104 @@
+LANE_RESPONSE = 0   # Antwoorden op commando's, worden nooit weggegooid
+LANE_TELEMETRY = 1  # BREATH_DATA
+LANE_LOG = 2        # debug_print uitvoer
+LANE_NAMES = ("response", "telemetry", "log")
+
+CDC_TX_BUFFER = 256          # Aangenomen grootte van de USB CDC zendbuffer
+TELEMETRY_MAX_LINES = 8
+LOG_MAX_LINES = 16
+RESPONSE_BACKLOG_LIMIT = 4096  # Boven dit aantal bytes worden geen nieuwe commando's uitgevoerd
+
+
+class OutputQueue:
+    """Prioritised outbound queue for the USB data channel.
+
+    Everything that goes to the host is queued per lane and ``pump()``
+    writes only what fits in the CDC transmit buffer, once per loop pass, so
+    a host that stops reading can never block the HID loop. Responses always
+    go first and are never dropped (``response_backlog`` lets the command
+    queue wait instead); telemetry and log lanes are bounded and drop their
+    oldest lines, counted in ``dropped``. A line that was written partly is
+    always finished before another line starts, so lines never interleave.
+    """
+
+    def __init__(self, buffer_size=CDC_TX_BUFFER):
+        self.buffer_size = buffer_size
+        self._lanes = ([], [], [])
+        self._limits = (None, TELEMETRY_MAX_LINES, LOG_MAX_LINES)
+        self._partial = None
+        self.response_backlog = 0
+        self.dropped = [0, 0, 0]
+        self.short_writes = 0
+
+    @property
+    def pending(self):
+        return self._partial is not None or any(self._lanes)
+
+    def put(self, data, lane=LANE_LOG):
+        queue = self._lanes[lane]
+        limit = self._limits[lane]
+        if limit is not None and len(queue) >= limit:
+            queue.pop(0)
+            self.dropped[lane] += 1
+        queue.append(data)
+        if lane == LANE_RESPONSE:
+            self.response_backlog += len(data)
+
+    def clear(self):
+        """Drop everything (host disconnected); counted per lane."""
+        for lane, queue in enumerate(self._lanes):
+            self.dropped[lane] += len(queue)
+            queue.clear()
+        self._partial = None
+        self.response_backlog = 0
+
+    def _next_line(self):
+        for lane, queue in enumerate(self._lanes):
+            if queue:
+                data = queue.pop(0)
+                if lane == LANE_RESPONSE:
+                    self.response_backlog -= len(data)
+                return memoryview(data)
+        return None
+
+    def pump(self, stream):
+        """Write queued lines without blocking. Returns the number of bytes written."""
+        if not stream.connected:
+            if self.pending:
+                self.clear()
+            return 0
+        free = self.buffer_size - stream.out_waiting
+        written = 0
+        while free > 0:
+            if self._partial is None:
+                self._partial = self._next_line()
+                if self._partial is None:
+                    break
+            chunk = self._partial[:free]
+            count = stream.write(chunk) or 0
+            written += count
+            free -= count
+            if count < len(chunk):
+                # Buffer voller dan gedacht (write_timeout = 0): volgende ronde verder
+                self._partial = self._partial[count:]
+                self.short_writes += 1
+                break
+            self._partial = self._partial[count:] if count < len(self._partial) else None
+        return written
+
+    def reset_counters(self):
+        """Zero the drop and short-write counters (SET:stats:reset)."""
+        self.dropped = [0, 0, 0]
+        self.short_writes = 0
+
+    def snapshot(self):
+        return {
+            "pending": [len(queue) for queue in self._lanes],
+            "dropped": dict(zip(LANE_NAMES, self.dropped)),
+            "response_backlog": self.response_backlog,
+            "short_writes": self.short_writes,
+        }
+
+
+# Gedeelde instantie voor code.py
+cdc_queue = OutputQueue()
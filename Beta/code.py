@@ -9,10 +9,53 @@ import usb_hid
 import usb_cdc
 import json
 import settings
+from event_log import event_log
+from perf_stats import perf_stats, heap_probe
+from perf_stats import STAGE_PARSE, STAGE_MAP, STAGE_HID, STAGE_LED, STAGE_TELEMETRY
+from ticks import ticks_ms, ticks_add, ticks_diff
+from recovery import ErrorBudget, start_watchdog, feed_watchdog
+from scheduler import IdleScheduler
+from gpio_output import TimedOutput, BLOW, INHALE
+from gestures import GestureRecognizer, GESTURE_NAMES, NONE as GESTURE_NONE
+from gestures import ACTION_BUTTON, ACTION_GPIO, ACTION_DFPLAYER_NEXT, compile_actions
+from gestures import ACTION_PROFILE, PROFILE_NEXT
+from profiles import profiles
+from sensors import read_latest_line, UartChannel, AdcChannel
+from cdc_queue import cdc_queue, LANE_RESPONSE, LANE_TELEMETRY, LANE_LOG, RESPONSE_BACKLOG_LIMIT
+from hid_descriptor import read_enabled_layout
 
 print("\n=== CODE START ===")
 print("Board:", board.board_id)
 
+# --- Foutbudgetten per subsysteem ---
+# Een subsysteem dat herhaaldelijk faalt wordt tijdelijk overgeslagen (met oplopende
+# wachttijd) in plaats van de HID loop op te houden.
+cdc_guard = ErrorBudget("cdc")
+led_guard = ErrorBudget("led")
+dfplayer_guard = ErrorBudget("dfplayer", backoff_ms=2000)
+uart_guard = ErrorBudget("uart", budget=1, backoff_ms=250, max_backoff_ms=5000)
+loop_guard = ErrorBudget("main_loop", budget=5, backoff_ms=50, max_backoff_ms=1000)
+SUBSYSTEM_GUARDS = (cdc_guard, led_guard, dfplayer_guard, uart_guard, loop_guard)
+
+# Schrijven naar de host blokkeert nooit; alles loopt via cdc_queue (zie cdc_queue.py)
+if usb_cdc.data:
+    usb_cdc.data.write_timeout = 0
+
+def cdc_write(data, lane=LANE_LOG):
+    """Queue bytes for the USB data channel; pump_cdc() writes them"""
+    cdc_queue.put(data, lane)
+
+def pump_cdc():
+    """Write as much queued output as fits in the CDC buffer, counted for GET:stats"""
+    if not usb_cdc.data or not cdc_guard.available():
+        return
+    try:
+        perf_stats.cdc_bytes += cdc_queue.pump(usb_cdc.data)
+        cdc_guard.success()
+    except Exception as e:
+        if cdc_guard.failure(e):
+            print(f"CDC writes paused after errors: {e}")
+
 def debug_print(message):
     """Print to both console and USB serial if available"""
     # Zorg ervoor dat message een string is
@@ -22,10 +65,15 @@ def debug_print(message):
     print(message)
     try:
         if usb_cdc.data and usb_cdc.data.connected:
-            usb_cdc.data.write(f"{message}\n".encode())
+            cdc_write(f"{message}\n".encode())
     except Exception as e:
         print(f"Error in debug_print: {e}")
 
+def log_event(message, error=False):
+    """debug_print plus an entry in the persistent event log (see event_log.py)"""
+    debug_print(message)
+    event_log.log(message, error=error)
+
 debug_print("Debug print test...")
 
 try:
@@ -35,13 +83,6 @@ except ImportError:
     DFPLAYER_AVAILABLE = False
     debug_print("DFPlayer bibliotheek niet gevonden. DFPlayer functionaliteit is uitgeschakeld.")
 
-# --- XAC Gamepad Report Descriptor ---
-XAC_GAMEPAD_REPORT_DESCRIPTOR = bytes((
-    0x05, 0x01, 0x09, 0x05, 0xA1, 0x01, 0x85, 0x05, 0x05, 0x01, 0x09, 0x30, 0x09, 0x31,
-    0x15, 0x00, 0x26, 0xFF, 0x00, 0x75, 0x08, 0x95, 0x02, 0x81, 0x02, 0x05, 0x09, 0x19,
-    0x01, 0x29, 0x08, 0x15, 0x00, 0x25, 0x01, 0x75, 0x01, 0x95, 0x08, 0x81, 0x02, 0xC0
-))
-
 # --- Configure Status LED ---
 NUM_STATUS_PIXELS = 1
 status_pixels = neopixel.NeoPixel(board.GP16, NUM_STATUS_PIXELS, brightness=0.1, auto_write=True)
@@ -55,52 +96,84 @@ RAINBOW_COLORS = [
     (0, 0, 255), (75, 0, 130), (148, 0, 211)
 ]
 
+def led_failure(e):
+    if led_guard.failure(e):
+        log_event(f"LED updates paused after errors: {e}", error=True)
+
+def show_ring():
+    """led_ring.show() with a counter for GET:stats"""
+    if not led_guard.available():
+        return
+    try:
+        led_ring.show()
+        perf_stats.led_shows += 1
+        led_guard.success()
+    except Exception as e:
+        led_failure(e)
+
 def set_status_color(color):
     """Set the status LED color"""
     if settings.settings["dfplayer_enabled"]:
         # Als DFPlayer is ingeschakeld, gebruik oranje voor neutrale status
         if color == (0, 0, 255):  # Als het de neutrale blauwe kleur is
             color = (255, 128, 0)  # Verander naar oranje
-    status_pixels.fill(color)
-    status_pixels.show()
+    if not led_guard.available():
+        return
+    try:
+        status_pixels.fill(color)
+        status_pixels.show()
+    except Exception as e:
+        led_failure(e)
 
 debug_print("Current settings at startup:")
 debug_print(json.dumps(settings.settings))
 
 def map_range(value, in_min, in_max, out_min, out_max):
+    # Midden en uitslag volgen uit out_min/out_max (0-255 of 0-65535 bij de extended layout)
+    center = (out_min + out_max + 1) // 2
+    half = out_max - center
     deadzone = settings.settings["deadzone"]
     sensitivity = settings.settings["sensitivity"]
     if abs(value) < deadzone:
-        return 128
+        return center
     value_abs = abs(value)
     try:
         scaled_power = math.pow(value_abs, 1.0 / sensitivity if sensitivity != 0 else 1.0)
     except (ValueError, ZeroDivisionError):
          scaled_power = value_abs
     scaled_power = min(1.0, scaled_power)
-    scaled = int(scaled_power * 127)
-    result = 128
+    scaled = int(scaled_power * half)
+    result = center
     if value > 0:
         direction = settings.settings["blow_direction"]
         if direction in ["up", "left"]:
-            result = 128 + scaled
+            result = center + scaled
         else:
-            result = 128 - scaled
+            result = center - scaled
     elif value < 0:
         direction = settings.settings["inhale_direction"]
         if direction in ["up", "left"]:
-            result = 128 + scaled
+            result = center + scaled
         else:
-            result = 128 - scaled
-    return max(0, min(255, result))
+            result = center - scaled
+    return max(out_min, min(out_max, result))
 
 # --- GPIO Triggers ---
 blow_gpio = digitalio.DigitalInOut(board.GP8)
 blow_gpio.direction = digitalio.Direction.OUTPUT
-blow_gpio.value = False
 inhale_gpio = digitalio.DigitalInOut(board.GP19)
 inhale_gpio.direction = digitalio.Direction.OUTPUT
-inhale_gpio.value = False
+# Pinnen worden alleen geschreven bij een verandering (zie gpio_output.py)
+blow_output = TimedOutput(blow_gpio, BLOW)
+inhale_output = TimedOutput(inhale_gpio, INHALE)
+
+def update_gpio_outputs(breath_value, now_ms):
+    s = settings.settings
+    enabled = s["gpio_mode_enabled"]
+    hysteresis = s["gpio_hysteresis"]
+    hold_ms = int(s["gpio_duration"])
+    blow_output.update(breath_value, s["blow_gpio_threshold"], hysteresis, hold_ms, now_ms, enabled)
+    inhale_output.update(breath_value, s["inhale_gpio_threshold"], hysteresis, hold_ms, now_ms, enabled)
 
 # --- DFPlayer Mini Setup ---
 dfplayer = None
@@ -133,10 +206,21 @@ if DFPLAYER_AVAILABLE:
             debug_print("Play commando verzonden")
 
     except Exception as e:
-        debug_print(f"Fout bij initialiseren DFPlayer: {e}")
+        log_event(f"Fout bij initialiseren DFPlayer: {e}", error=True)
         debug_print(f"Fout type: {type(e)}")
         DFPLAYER_AVAILABLE = False
 
+NUM_TRACKS = 5  # Aantal nummers in map 01 op de SD kaart
+
+def dfplayer_next_track():
+    """Play the next track from folder 01 (wraps after NUM_TRACKS)"""
+    current_track = settings.settings["current_track"]
+    new_track = (current_track % NUM_TRACKS) + 1  # 1-NUM_TRACKS
+    if new_track != current_track:
+        settings.settings["current_track"] = new_track
+        dfplayer.play(folder=1, track=new_track)  # Speel af uit map 01
+        debug_print(f"Volgend nummer: map 01, nummer {new_track:03d}.mp3 (volume: {settings.settings['current_volume']})")
+
 # --- Measurement Variables ---
 is_measuring = False
 measurement_data = {
@@ -148,8 +232,99 @@ measurement_data = {
     "longest_inhale": 0
 }
 
-# Buffer voor lange commando's
-command_buffer = ""
+# --- Commando protocol ---
+# Commando's zijn regels die eindigen op "\n". Optioneel begint een regel met
+# "#<id> "; alle antwoorden op dat commando krijgen dan dezelfde prefix, zodat
+# de host meerdere commando's tegelijk kan versturen (pipelining). Ze worden
+# in volgorde uitgevoerd, een paar per loop ronde. "BATCH::[...]" voert een
+# JSON lijst commando's uit en geeft één BATCH:: antwoord terug.
+# Staat de wachtrij vol, dan wordt usb_cdc.data niet meer gelezen en remt de
+# USB flow control de host af; er wordt niets weggegooid of extra beantwoord.
+CDC_MAX_LINE = 8192          # Langere regels worden weggegooid
+CDC_MAX_PENDING = 16         # Zoveel commando's mogen in de wachtrij staan
+CDC_COMMANDS_PER_PASS = 4    # Zoveel commando's worden per loop ronde uitgevoerd
+cdc_rx = bytearray()
+pending_commands = []
+cdc_rx_held = False          # cdc_rx bevat complete regels die nog wachten op ruimte
+cdc_rx_paused = 0            # Loop rondes waarin niet gelezen werd (wachtrij vol)
+response_prefix = ""         # "#<id> " van het commando dat nu uitgevoerd wordt
+batch_responses = None       # Verzamelt de antwoorden tijdens een BATCH
+
+def respond(line):
+    """Send one response line for the current command, tagged with its request id"""
+    if batch_responses is not None:
+        batch_responses.append(line)
+        return
+    cdc_write(f"{response_prefix}{line}\n".encode(), LANE_RESPONSE)
+
+def receive_commands(data):
+    """Assemble complete lines from the CDC byte stream into the command queue"""
+    global cdc_rx, cdc_rx_held
+    cdc_rx.extend(data)
+    cdc_rx_held = False
+    while True:
+        if len(pending_commands) >= CDC_MAX_PENDING:
+            # Rest blijft in cdc_rx tot er weer plaats is in de wachtrij
+            cdc_rx_held = b"\n" in cdc_rx
+            break
+        end = cdc_rx.find(b"\n")
+        if end < 0:
+            break
+        line = bytes(cdc_rx[:end])
+        cdc_rx = cdc_rx[end + 1:]
+        try:
+            line = line.decode("utf-8").strip()
+        except UnicodeError as e:
+            debug_print(f"Unicode decode error: {e}")
+            continue
+        if not line:
+            continue
+        pending_commands.append(line)
+    if not cdc_rx_held and len(cdc_rx) > CDC_MAX_LINE:
+        debug_print(f"Command line too long, dropped {len(cdc_rx)} bytes")
+        cdc_rx = bytearray()
+
+def split_request_id(line):
+    """Split "#<id> command" into ("#<id> ", "command")"""
+    if line.startswith("#"):
+        request_id, _, command = line.partition(" ")
+        return request_id + " ", command
+    return "", line
+
+def run_pending_commands():
+    """Execute queued commands in order, at most CDC_COMMANDS_PER_PASS per call"""
+    global response_prefix
+    for _ in range(CDC_COMMANDS_PER_PASS):
+        if not pending_commands:
+            return
+        response_prefix, command = split_request_id(pending_commands.pop(0))
+        try:
+            handle_serial_command(command)
+        finally:
+            response_prefix = ""
+
+def handle_batch(payload):
+    """Run a JSON list of commands; the responses of each come back in one BATCH:: line"""
+    global batch_responses
+    try:
+        commands = json.loads(payload)
+        if not isinstance(commands, list):
+            raise ValueError("expected a list of commands")
+    except Exception as e:
+        respond(f"ERROR:Batch error: {e}")
+        return
+    results = []
+    try:
+        for command in commands:
+            batch_responses = []
+            if not isinstance(command, str) or command.startswith("BATCH::"):
+                batch_responses.append("ERROR:Invalid batch command")
+            else:
+                handle_serial_command(command)
+            results.append(batch_responses)
+    finally:
+        batch_responses = None
+    respond(f"BATCH::{json.dumps(results)}")
 
 def update_measurements(breath_value):
     global measurement_data
@@ -190,8 +365,26 @@ def update_measurements(breath_value):
                 debug_print(f"New longest exhale: {measurement_data['longest_exhale']}")
             measurement_data["current_exhale_start"] = None
 
+def collect_stats():
+    """Runtime counters for GET:stats, including the HID report counters"""
+    stats = perf_stats.snapshot()
+    stats["hid_reports_sent"] = gamepad.reports_sent if gamepad else 0
+    stats["hid_reports_suppressed"] = gamepad.reports_suppressed if gamepad else 0
+    stats["watchdog_armed"] = watchdog_armed
+    stats["idle_waits"] = scheduler.idle_waits
+    stats["idle_ms"] = scheduler.idle_slices
+    stats["gestures"] = dict(zip(GESTURE_NAMES[1:], gesture_counts[1:]))
+    stats["profile"] = profiles.active
+    stats["profile_switches"] = profiles.switches
+    stats["extra_sensors"] = [channel.snapshot() for _, channel in extra_sensors]
+    stats["cdc"] = cdc_queue.snapshot()
+    stats["cdc"]["rx_paused"] = cdc_rx_paused
+    stats["log"] = event_log.snapshot()
+    stats["subsystems"] = {guard.name: guard.snapshot() for guard in SUBSYSTEM_GUARDS}
+    return stats
+
 def handle_serial_command(command):
-    global is_measuring, command_buffer
+    global is_measuring, cdc_rx_paused
     try:
         # Zorg ervoor dat command een string is
         if isinstance(command, bytes):
@@ -203,32 +396,10 @@ def handle_serial_command(command):
 
         debug_print(f"Processing command: '{command[:50]}{'...' if len(command) > 50 else ''}'")
 
-        # Als we een command buffer hebben, voeg dit toe
-        if command_buffer:
-            command_buffer += command
-            debug_print(f"Added to buffer, total length: {len(command_buffer)}")
-
-            # Check of JSON nu compleet is
-            if command_buffer.strip().endswith('}'):
-                complete_command = command_buffer
-                command_buffer = ""  # Reset buffer
-                debug_print("JSON complete, processing full command")
-                # Recursief aanroepen met complete command
-                handle_serial_command(complete_command)
-                return
-            else:
-                debug_print("JSON still incomplete, waiting for more...")
-                return
-
-        # Check voor nieuwe lange commando's
-        if command.startswith("SET:settings::") and not command.strip().endswith('}'):
-            command_buffer = command
-            debug_print("Started new JSON buffer")
+        if command.startswith("BATCH::"):
+            handle_batch(command[len("BATCH::"):])
             return
 
-        # Normale commando verwerking
-        debug_print(f"Processing complete command: {command[:100]}...")
-
         # Parse het commando
         if "::" in command:
             parts = command.split("::", 1)
@@ -237,8 +408,9 @@ def handle_serial_command(command):
             parts = [command]
             cmd_parts = command.split(":")
 
-        if len(cmd_parts) < 2 and not command.startswith("SAVE"):
+        if len(cmd_parts) < 2 and cmd_parts[0] not in ("SAVE", "EXPORT", "IMPORT"):
             debug_print(f"Invalid command format: {command}")
+            respond("ERROR:Invalid command format")
             return
 
         cmd_type = cmd_parts[0] if cmd_parts else ""
@@ -249,9 +421,29 @@ def handle_serial_command(command):
         if cmd_type == "GET":
             if cmd_param == "settings":
                 response = json.dumps(settings.settings)
-                usb_cdc.data.write(f"SETTINGS::{response}\n".encode())
+                respond(f"SETTINGS::{response}")
                 debug_print("Sent current settings")
 
+            elif cmd_param == "log":
+                response = json.dumps(event_log.entries())
+                respond(f"LOG::{response}")
+                debug_print("Sent event log")
+
+            elif cmd_param == "stats":
+                response = json.dumps(collect_stats())
+                respond(f"STATS::{response}")
+                debug_print("Sent runtime stats")
+
+            elif cmd_param == "heap":
+                response = json.dumps(heap_probe.snapshot())
+                respond(f"HEAP::{response}")
+                debug_print("Sent heap stats")
+
+            elif cmd_param == "profiles":
+                response = json.dumps(profiles.summary())
+                respond(f"PROFILES::{response}")
+                debug_print("Sent profiles")
+
             elif cmd_param == "measurements":
                 data_to_send = measurement_data.copy()
                 if data_to_send["max_exhale"] == -float('inf'):
@@ -260,9 +452,12 @@ def handle_serial_command(command):
                     data_to_send["min_inhale"] = None
 
                 response = json.dumps(data_to_send)
-                usb_cdc.data.write(f"MEASUREMENTS::{response}\n".encode())
+                respond(f"MEASUREMENTS::{response}")
                 debug_print("Sent measurement data")
 
+            else:
+                respond(f"ERROR:Unknown GET parameter: {cmd_param}")
+
         elif cmd_type == "SET":
             if cmd_param == "settings" and len(parts) > 1:
                 try:
@@ -274,14 +469,16 @@ def handle_serial_command(command):
                     # Update settings
                     for key, value in new_settings.items():
                         settings.settings[key] = value
+                    configure_gestures()
+                    configure_extra_sensors()
 
                     debug_print("Settings updated successfully")
-                    usb_cdc.data.write(b"OK\n")
+                    respond("OK")
 
                 except Exception as e:
                     error_msg = f"JSON error: {str(e)}"
                     debug_print(error_msg)
-                    usb_cdc.data.write(f"ERROR:{error_msg}\n".encode())
+                    respond(f"ERROR:{error_msg}")
 
             elif cmd_param == "measure" and len(cmd_parts) > 2:
                 measure_value = cmd_parts[2]
@@ -301,16 +498,68 @@ def handle_serial_command(command):
                     })
                     debug_print("Measurement data reset")
 
-                usb_cdc.data.write(b"OK\n")
+                respond("OK")
+
+            elif cmd_param == "log" and len(cmd_parts) > 2 and cmd_parts[2] == "clear":
+                event_log.clear()
+                debug_print("Event log cleared")
+                respond("OK")
+
+            elif cmd_param == "stats" and len(cmd_parts) > 2 and cmd_parts[2] == "reset":
+                perf_stats.reset()
+                if gamepad:
+                    gamepad.reset_counters()
+                for guard in SUBSYSTEM_GUARDS:
+                    guard.reset()
+                cdc_queue.reset_counters()
+                cdc_rx_paused = 0
+                scheduler.reset()
+                for i in range(len(gesture_counts)):
+                    gesture_counts[i] = 0
+                debug_print("Runtime stats reset")
+                respond("OK")
+
+            elif cmd_param == "heap" and len(cmd_parts) > 2 and cmd_parts[2] == "reset":
+                heap_probe.reset()
+                debug_print("Heap stats reset")
+                respond("OK")
+
+            else:
+                respond(f"ERROR:Unknown SET parameter: {cmd_param}")
+
+        elif cmd_type == "PROFILE":
+            # PROFILE:<slot>, PROFILE:next of PROFILE:save:<slot>[:naam]
+            if cmd_param == "save" and len(cmd_parts) > 2 and cmd_parts[2].isdigit():
+                name = ":".join(cmd_parts[3:]) or None
+                if profiles.save_slot(int(cmd_parts[2]), name):
+                    respond("OK")
+                    debug_print(f"Profile slot {cmd_parts[2]} saved")
+                else:
+                    respond("ERROR:Failed to save profile")
+                    log_event(f"Failed to save profile slot {cmd_parts[2]}", error=True)
+            elif cmd_param == "next" or cmd_param.isdigit():
+                slot = profiles.next_slot() if cmd_param == "next" else int(cmd_param)
+                if switch_profile(slot):
+                    respond("OK")
+                else:
+                    respond(f"ERROR:Empty profile slot {slot}")
+            else:
+                debug_print(f"Invalid profile command: {command}")
+                respond("ERROR:Invalid profile command")
 
         elif cmd_type == "SAVE" or command == "SAVE":
             debug_print("Saving settings...")
-            if settings.save_settings():
-                usb_cdc.data.write(b"OK\n")
+            # Met een actief profiel gaan wijzigingen naar dat slot in plaats van settings.json
+            if profiles.active:
+                saved = profiles.save_slot(profiles.active)
+            else:
+                saved = settings.save_settings()
+            if saved:
+                respond("OK")
                 debug_print("Settings saved successfully")
             else:
-                usb_cdc.data.write(b"ERROR:Failed to save settings\n")
-                debug_print("Failed to save settings")
+                respond("ERROR:Failed to save settings")
+                log_event("Failed to save settings", error=True)
 
         elif cmd_type == "EXPORT" or command == "EXPORT":
             debug_print("Exporting settings...")
@@ -319,12 +568,12 @@ def handle_serial_command(command):
                 debug_print("=== SETTINGS EXPORT ===")
                 debug_print(json_export)
                 debug_print("=== END EXPORT ===")
-                usb_cdc.data.write(f"EXPORT::{json_export}\n".encode())
+                respond(f"EXPORT::{json.dumps(settings.settings)}")  # Antwoord altijd op één regel
                 debug_print("Settings exported successfully")
             except Exception as e:
                 error_msg = f"Export error: {str(e)}"
                 debug_print(error_msg)
-                usb_cdc.data.write(f"ERROR:{error_msg}\n".encode())
+                respond(f"ERROR:{error_msg}")
 
         elif cmd_type == "IMPORT" and len(parts) > 1:
             debug_print("Importing settings...")
@@ -337,24 +586,29 @@ def handle_serial_command(command):
                 # Update settings
                 for key, value in imported_settings.items():
                     settings.settings[key] = value
+                configure_gestures()
+                configure_extra_sensors()
 
                 debug_print("Settings imported successfully")
-                usb_cdc.data.write(b"OK\n")
+                respond("OK")
 
             except Exception as e:
                 error_msg = f"Import error: {str(e)}"
                 debug_print(error_msg)
-                usb_cdc.data.write(f"ERROR:{error_msg}\n".encode())
+                respond(f"ERROR:{error_msg}")
+
+        else:
+            respond(f"ERROR:Unknown command: {cmd_type}")
 
     except Exception as e:
         error_msg = f"Command error: {str(e)}"
         debug_print(error_msg)
         try:
-            usb_cdc.data.write(f"ERROR:{error_msg}\n".encode())
+            respond(f"ERROR:{error_msg}")
         except Exception:
             pass
 
-debug_print("GroovTube XAC Gamepad starting...")
+log_event("GroovTube XAC Gamepad starting...")
 
 # --- Global Gamepad Variables ---
 gamepad = None
@@ -366,8 +620,9 @@ if usb_hid.devices:
         if device.usage_page == 0x01 and device.usage == 0x05:
             try:
                 from hid_xac_gamepad import Gamepad
-                gamepad = Gamepad(usb_hid.devices)
-                gamepad.move_joysticks(x=128, y=128)
+                # De layout die boot.py echt heeft ingeschakeld (nvm), niet de huidige settings
+                gamepad = Gamepad(usb_hid.devices, layout=read_enabled_layout())
+                gamepad.move_joysticks(x=gamepad.axis_center, y=gamepad.axis_center)
                 hid_enabled = True
                 print("[CODE] Gamepad class initialized and joysticks centered.")
             except Exception as e:
@@ -379,16 +634,104 @@ else:
 if not hid_enabled:
     print("[CODE] Continuing without HID Gamepad.")
 
+AXIS_MAX = gamepad.axis_max if gamepad else 255
+AXIS_CENTER = gamepad.axis_center if gamepad else 128
+EXTRA_AXES = gamepad.extra_axes if gamepad else False
+
 # --- UART Initialization ---
 uart = None
+UART_MAX_LINES_PER_PASS = 8
+UART_READ_TIMEOUT_S = 0.02   # readline() blokkeert nooit langer dan dit bij een half ontvangen regel
+UART_RESYNC_AFTER_S = 0.5    # Zo lang geen geldige sample: UART opnieuw initialiseren
+UART_MAX_PARSE_ERRORS = 5    # Opeenvolgende parse fouten: input buffer legen
+UART_REINIT_BACKOFF_MS = 250 # Wachttijd tussen herinitialisaties, verdubbelt tot de maximale
+UART_REINIT_MAX_BACKOFF_MS = 5000
+uart_reinit_backoff_ms = UART_REINIT_BACKOFF_MS
+uart_reinit_at = None        # Nog nooit opnieuw geïnitialiseerd
+
+def init_uart():
+    return busio.UART(board.GP0, board.GP1, baudrate=115200, timeout=UART_READ_TIMEOUT_S)
+
+def flush_uart():
+    """Drop buffered (corrupt) input so the next read starts on a fresh line"""
+    uart.reset_input_buffer()
+    perf_stats.uart_flushes += 1
+
+def reinit_uart():
+    """Re-create the sensor UART after a lost connection.
+
+    Only a failing init_uart() counts against uart_guard; a routine re-init
+    just schedules the next attempt with a doubling backoff.
+    """
+    global uart, uart_reinit_at, uart_reinit_backoff_ms
+    if uart is not None:
+        try:
+            uart.deinit()
+        except Exception:
+            pass
+        uart = None
+    try:
+        uart = init_uart()
+        perf_stats.uart_reinits += 1
+    except Exception as e:
+        uart_guard.failure(e)
+        return
+    # Pas een geldige sample zet de wachttijd terug
+    uart_reinit_at = ticks_add(ticks_ms(), uart_reinit_backoff_ms)
+    uart_reinit_backoff_ms = min(uart_reinit_backoff_ms * 2, UART_REINIT_MAX_BACKOFF_MS)
+
 try:
-    uart = busio.UART(board.GP0, board.GP1, baudrate=115200)
+    uart = init_uart()
     debug_print("UART initialized")
     set_status_color((0, 0, 255))
 except Exception as e:
-    debug_print(f"Error initializing UART: {e}")
+    log_event(f"Error initializing UART: {e}", error=True)
     set_status_color((64, 0, 64))
 
+# --- Extra sensor kanalen (bijv. een tweede buis) ---
+# De samples van de hoofdsensor bepalen het report ritme; elk extra kanaal levert
+# bij elke sample zijn laatste waarde (zie sensors.py). Elk kanaal heeft zijn eigen
+# as en knoppen uit settings "extra_sensors".
+def extra_sensor_config(index):
+    """Settings of extra sensor ``index``, completed with EXTRA_SENSOR_DEFAULTS"""
+    config = dict(settings.EXTRA_SENSOR_DEFAULTS)
+    entries = settings.settings["extra_sensors"]
+    if index < len(entries):
+        config.update(entries[index])
+    return config
+
+def init_extra_sensor(index, uart_in_use):
+    config = extra_sensor_config(index)
+    kind = config["type"]
+    if kind == "uart":
+        # De RP2040 heeft twee UARTs: UART0 voor de hoofdsensor, UART1 deelt hij met de DFPlayer
+        if dfplayer is not None:
+            log_event(f"Extra sensor {index} (UART) not started: UART1 is used by the DFPlayer", error=True)
+            return None
+        if uart_in_use:
+            log_event(f"Extra sensor {index} (UART) not started: only one UART sensor possible", error=True)
+            return None
+        uart2 = busio.UART(getattr(board, config["uart_tx"]), getattr(board, config["uart_rx"]),
+                           baudrate=115200, timeout=UART_READ_TIMEOUT_S)
+        return UartChannel(f"uart{index}", uart2, UART_MAX_LINES_PER_PASS)
+    if kind == "adc":
+        import analogio
+        adc = analogio.AnalogIn(getattr(board, config["pin"]))
+        return AdcChannel(f"adc{index}:{config['pin']}", adc, span=config["span"])
+    return None
+
+extra_sensors = []  # (index in settings, kanaal)
+for index in range(len(settings.settings["extra_sensors"])):
+    try:
+        uart_in_use = any(channel.stream is not None for _, channel in extra_sensors)
+        channel = init_extra_sensor(index, uart_in_use)
+        if channel:
+            extra_sensors.append((index, channel))
+            log_event(f"Extra sensor {index} initialized: {channel.name}")
+    except Exception as e:
+        log_event(f"Error initializing extra sensor {index}: {e}", error=True)
+extra_sensor_streams = tuple(channel.stream for _, channel in extra_sensors if channel.stream is not None)
+
 # --- LED Ring State Variables
 current_rainbow_index = 0
 current_ring_color = RAINBOW_COLORS[current_rainbow_index]
@@ -400,7 +743,7 @@ def set_led_color_from_settings():
     """Stel LED kleur in op basis van instellingen"""
     if not settings.settings["led_enabled"]:
         led_ring.fill((0, 0, 0))
-        led_ring.show()
+        show_ring()
         return
 
     color_mode = settings.settings["led_color_mode"]
@@ -411,7 +754,7 @@ def set_led_color_from_settings():
         led_ring.fill(current_ring_color)
 
     led_ring.brightness = settings.settings["led_start_brightness"]
-    led_ring.show()
+    show_ring()
 
 def handle_pep_mode(breath_value):
     """Handle PEP (Positive Expiratory Pressure) mode"""
@@ -444,7 +787,7 @@ def handle_pep_mode(breath_value):
         success_color = settings.settings["pep_success_color"]
         led_ring.fill(tuple(success_color))
         led_ring.brightness = pep_brightness
-        led_ring.show()
+        show_ring()
 
         # Check of de tijd om is
         if current_time - pep_success_start_time >= settings.settings["pep_hold_time"]:
@@ -457,18 +800,24 @@ def handle_pep_mode(breath_value):
             blink_speed = settings.settings["pep_blink_speed"]
 
             for i in range(blink_times):
+                feed_watchdog()
                 # Uit
                 led_ring.fill((0, 0, 0))
-                led_ring.show()
+                show_ring()
                 time.sleep(blink_speed)
                 # Aan (met max helderheid)
                 led_ring.fill(tuple(success_color))
                 led_ring.brightness = settings.settings["pep_max_brightness"]
-                led_ring.show()
+                show_ring()
                 time.sleep(blink_speed)
 
             debug_print(f"PEP success blink completed ({blink_times} times)")
 
+            if settings.settings["pep_reward_type"] == "gpio":
+                # Beloningspuls op de 3,5mm uitgang (uitademen)
+                blow_output.pulse(int(settings.settings["pep_reward_gpio_duration"]), ticks_ms())
+                debug_print(f"PEP reward GPIO pulse ({settings.settings['pep_reward_gpio_duration']} ms)")
+
         return True
     else:
         if pep_target_reached:
@@ -489,31 +838,169 @@ def handle_pep_mode(breath_value):
         start_color = settings.settings["pep_start_color"]
         led_ring.fill(tuple(start_color))
         led_ring.brightness = pep_brightness
-        led_ring.show()
+        show_ring()
         return True
 
-def handle_gamepad_buttons(breath_value):
-    """Handle gamepad button presses based on breath values"""
-    if not gamepad or settings.settings["control_mode"] != "buttons":
-        return
+held_buttons = 0
+
+def breath_buttons_mask(breath_value):
+    """Button bitmask for this sample (bit 0 = button 1).
+
+    A button is pressed once its threshold is passed and stays held until the
+    breath returns to the deadzone.
+    """
+    global held_buttons
+    if abs(breath_value) < settings.settings["deadzone"]:
+        held_buttons = 0
+        return 0
 
     # Blazen knop
     blow_button = settings.settings["blow_button"]
     if blow_button != "none" and breath_value > settings.settings["blow_threshold"]:
-        button_num = int(blow_button)
-        debug_print(f"Pressing blow button {button_num}")
-        gamepad.press_buttons(button_num)
+        held_buttons |= 1 << (int(blow_button) - 1)
 
     # Inademen knop
     inhale_button = settings.settings["inhale_button"]
     if inhale_button != "none" and breath_value < -settings.settings["inhale_threshold"]:
-        button_num = int(inhale_button)
-        debug_print(f"Pressing inhale button {button_num}")
-        gamepad.press_buttons(button_num)
+        held_buttons |= 1 << (int(inhale_button) - 1)
 
-    # Release alle knoppen als we in de deadzone zijn
-    if abs(breath_value) < settings.settings["deadzone"]:
-        gamepad.release_buttons()
+    return held_buttons
+
+def breath_channel_axes(breath_value):
+    """Separate blow (Z) and inhale (Rz) axes for the extended layout"""
+    if not EXTRA_AXES:
+        return None, None
+    deadzone = settings.settings["deadzone"]
+    if breath_value > deadzone:
+        return int(min(1.0, breath_value) * AXIS_MAX), 0
+    if breath_value < -deadzone:
+        return 0, int(min(1.0, -breath_value) * AXIS_MAX)
+    return 0, 0
+
+def compose_buttons(breath_mask, control_mode, now_ms):
+    """Button bits of one report: breath buttons, gesture buttons and extra channels"""
+    buttons = gesture_buttons
+    if control_mode != "joystick":
+        buttons |= breath_mask
+        if extra_sensor_map:
+            buttons |= extra_sensors_buttons_mask(now_ms)
+    return buttons
+
+def handle_gamepad_buttons(breath_value):
+    """Handle gamepad button presses based on breath values (one report per sample)"""
+    if not gamepad or settings.settings["control_mode"] != "buttons":
+        return
+    z, rz = breath_channel_axes(breath_value)
+    buttons = compose_buttons(breath_buttons_mask(breath_value), "buttons", ticks_ms())
+    gamepad.set_state(buttons=buttons, z=z, rz=rz)
+
+def read_latest_uart_line():
+    """Newest complete line from the sensor UART, so the HID output follows the latest sample"""
+    return read_latest_line(uart, UART_MAX_LINES_PER_PASS, perf_stats)
+
+extra_sensor_map = ()  # (kanaal, as, teken, blaas drempel, blaas bit, zuig drempel, zuig bit)
+
+def button_bit(button):
+    return 0 if button == "none" else 1 << (int(button) - 1)
+
+def configure_extra_sensors():
+    """Precompile axis and buttons of every extra channel (after every settings change)"""
+    global extra_sensor_map
+    mapping = []
+    for index, channel in extra_sensors:
+        config = extra_sensor_config(index)
+        mapping.append((channel, config["axis"], -1.0 if config["invert"] else 1.0,
+                        config["blow_threshold"], button_bit(config["blow_button"]),
+                        config["inhale_threshold"], button_bit(config["inhale_button"])))
+    extra_sensor_map = tuple(mapping)
+
+def extra_sensor_axis_value(value, sign):
+    """Map an extra channel onto its own joystick axis"""
+    if abs(value) < settings.settings["deadzone"]:
+        return AXIS_CENTER
+    return max(0, min(AXIS_MAX, int(AXIS_CENTER + sign * value * AXIS_CENTER)))
+
+def extra_sensors_buttons_mask(now_ms):
+    """Buttons of the extra channels; pressed while their threshold is passed"""
+    mask = 0
+    for channel, _, _, blow_threshold, blow_bit, inhale_threshold, inhale_bit in extra_sensor_map:
+        value = channel.aligned(now_ms)
+        if value > blow_threshold:
+            mask |= blow_bit
+        elif value < -inhale_threshold:
+            mask |= inhale_bit
+    return mask
+
+# --- Gebaren (sip-and-puff) ---
+GESTURE_PRESS_MS = 100  # Zo lang wordt een knop van een gebaar ingedrukt
+gesture_recognizer = GestureRecognizer()
+gesture_actions = ()
+gesture_buttons = 0
+gesture_release_at = 0
+gesture_counts = [0] * len(GESTURE_NAMES)
+
+def configure_gestures():
+    """Copy the gesture settings into the recognizer and precompile the actions.
+
+    Called at startup and after every settings change, so the per-sample path
+    only does a tuple lookup.
+    """
+    global gesture_actions
+    s = settings.settings
+    gesture_actions, enabled = compile_actions(s["gesture_actions"])
+    r = gesture_recognizer
+    r.enabled = enabled if s["gesture_enabled"] else 0
+    r.puff_threshold = s["gesture_puff_threshold"]
+    r.sip_threshold = s["gesture_sip_threshold"]
+    r.hard_sip_threshold = s["gesture_hard_sip_threshold"]
+    r.hysteresis = s["gesture_hysteresis"]
+    r.long_ms = int(s["gesture_long_ms"])
+    r.double_gap_ms = int(s["gesture_double_gap_ms"])
+    r.sip_puff_gap_ms = int(s["gesture_sip_puff_gap_ms"])
+    r.reset()
+
+def run_gesture_action(event, now_ms):
+    """Execute the action mapped to a recognized gesture"""
+    global gesture_buttons, gesture_release_at
+    gesture_counts[event] += 1
+    kind, arg = gesture_actions[event]
+    if kind == ACTION_BUTTON:
+        # Knop wordt na GESTURE_PRESS_MS in de main loop weer losgelaten
+        gesture_buttons |= arg
+        gesture_release_at = ticks_add(now_ms, GESTURE_PRESS_MS)
+    elif kind == ACTION_GPIO:
+        output = blow_output if arg == BLOW else inhale_output
+        output.pulse(int(settings.settings["gesture_gpio_ms"]), now_ms)
+    elif kind == ACTION_PROFILE:
+        switch_profile(profiles.next_slot() if arg == PROFILE_NEXT else arg)
+    elif kind == ACTION_DFPLAYER_NEXT:
+        if DFPLAYER_AVAILABLE and dfplayer is not None and dfplayer_guard.available():
+            try:
+                dfplayer_next_track()
+                dfplayer_guard.success()
+            except Exception as e:
+                log_event(f"Fout bij DFPlayer operatie: {e}", error=True)
+                dfplayer_guard.failure(e)
+    debug_print(f"Gesture: {GESTURE_NAMES[event]}")
+
+def switch_profile(slot):
+    """Make a stored profile the live settings (no JSON parsing, no flash write)"""
+    global held_buttons, gesture_buttons
+    if not profiles.activate(slot):
+        return False
+    configure_gestures()
+    configure_extra_sensors()
+    held_buttons = 0
+    gesture_buttons = 0
+    if gamepad:
+        gamepad.reset_all()
+    set_led_color_from_settings()
+    log_event(f"Profile {slot} active: {profiles.names[slot]}")
+    return True
+
+profiles.load()
+configure_gestures()
+configure_extra_sensors()
 
 # Initialize LED ring with settings
 set_led_color_from_settings()
@@ -521,44 +1008,75 @@ set_led_color_from_settings()
 # --- Main Loop ---
 last_uart_success = time.monotonic()
 breath_value = 0.0
+GC_IDLE_SETTLE_MS = 250  # Zo lang moet de adem in de deadzone zijn voor een idle gc.collect()
+last_breath_activity_ms = ticks_ms()
+consecutive_parse_errors = 0
+scheduler = IdleScheduler()
+
+watchdog_armed = False
+if settings.settings["watchdog_enabled"]:
+    watchdog_armed = start_watchdog()
+    log_event(f"Watchdog armed: {watchdog_armed}")
 
 while True:
+    loop_start_ns = time.monotonic_ns()
+    feed_watchdog()
     try:
         # Check USB Serial for commands
-        if usb_cdc.data and usb_cdc.data.in_waiting:
-            # Lees alle beschikbare bytes
+        if usb_cdc.data and len(pending_commands) >= CDC_MAX_PENDING:
+            cdc_rx_paused += 1  # Niet lezen: de host wordt via USB flow control afgeremd
+        elif usb_cdc.data and usb_cdc.data.in_waiting:
+            # Lees alle beschikbare bytes; alleen complete regels worden commando's
             available_bytes = usb_cdc.data.read(usb_cdc.data.in_waiting)
             if available_bytes:
-                debug_print(f"Raw bytes received: {list(available_bytes)}")
-                try:
-                    command = available_bytes.decode('utf-8')
-                    debug_print(f"Decoded command: '{command.strip()}'")
-                    if command.strip():  # Alleen verwerken als er daadwerkelijk een commando is
-                        handle_serial_command(command)
-                except UnicodeDecodeError as e:
-                    debug_print(f"Unicode decode error: {e}")
-                except Exception as e:
-                    debug_print(f"Error processing command: {e}")
+                scheduler.activity()
+                receive_commands(available_bytes)
+        elif cdc_rx_held:
+            receive_commands(b"")
+        # Nieuwe commando's pas uitvoeren als de host de vorige antwoorden heeft opgehaald
+        if pending_commands and cdc_queue.response_backlog < RESPONSE_BACKLOG_LIMIT:
+            scheduler.activity()
+            run_pending_commands()
+
+        if extra_sensors:
+            now_ms = ticks_ms()
+            for _, channel in extra_sensors:
+                if channel.poll(now_ms) and abs(channel.value) > settings.settings["deadzone"]:
+                    scheduler.activity()
 
         if uart is not None and uart.in_waiting:
-            data_line = uart.readline()
+            heap_probe.enabled = settings.settings["heap_instrumentation"]
+            heap_probe.begin_sample()
+            data_line = read_latest_uart_line()
             if data_line:
                 try:
                     breath_value = float(data_line.decode().strip())
                     last_uart_success = time.monotonic()
+                    perf_stats.uart_samples += 1
+                    consecutive_parse_errors = 0
+                    uart_guard.success()
+                    uart_reinit_backoff_ms = UART_REINIT_BACKOFF_MS
+                    heap_probe.stage(STAGE_PARSE)
 
                     if usb_cdc.data and usb_cdc.data.connected:
-                        usb_cdc.data.write(f"BREATH_DATA:{breath_value}\n".encode())
+                        cdc_write(f"BREATH_DATA:{breath_value}\n".encode(), LANE_TELEMETRY)
 
                     if is_measuring:
                         update_measurements(breath_value)
+                    heap_probe.stage(STAGE_TELEMETRY)
 
                     # GPIO triggers
-                    blow_gpio.value = breath_value > settings.settings["blow_gpio_threshold"]
-                    inhale_gpio.value = breath_value < settings.settings["inhale_gpio_threshold"]
+                    now_ms = ticks_ms()
+                    update_gpio_outputs(breath_value, now_ms)
+
+                    # Gebaren; een knop-actie komt in hetzelfde report als deze sample
+                    if gesture_recognizer.enabled:
+                        gesture = gesture_recognizer.update(breath_value, now_ms)
+                        if gesture != GESTURE_NONE:
+                            run_gesture_action(gesture, now_ms)
 
                     # DFPlayer functionaliteit (verbeterd)
-                    if settings.settings["dfplayer_enabled"] and DFPLAYER_AVAILABLE and dfplayer is not None:
+                    if settings.settings["dfplayer_enabled"] and DFPLAYER_AVAILABLE and dfplayer is not None and dfplayer_guard.available():
                         try:
                             if breath_value > 0 and breath_value > settings.settings["deadzone"]:  # Uitademen - volume omhoog
                                 current_volume = min(
@@ -577,23 +1095,23 @@ while True:
                                     debug_print(f"Volume terug naar min: {settings.settings['min_volume']}")
 
                             if breath_value < settings.settings["track_change_threshold"]:  # Inademen drempel voor volgend nummer
-                                current_track = settings.settings["current_track"]
-                                # Bepaal het aantal tracks in map 01 (stel in als constante of haal dynamisch op)
-                                NUM_TRACKS = 5  # Pas dit aan naar het juiste aantal tracks
-                                new_track = (current_track % NUM_TRACKS) + 1  # 1-NUM_TRACKS
-                                if new_track != current_track:
-                                    settings.settings["current_track"] = new_track
-                                    dfplayer.play(folder=1, track=new_track)  # Speel af uit map 01
-                                    debug_print(f"Volgend nummer: map 01, nummer {new_track:03d}.mp3 (volume: {settings.settings['current_volume']})")
+                                dfplayer_next_track()
+                            dfplayer_guard.success()
                         except Exception as e:
-                            debug_print(f"Fout bij DFPlayer operatie: {e}")
-                            settings.settings["dfplayer_enabled"] = False
+                            log_event(f"Fout bij DFPlayer operatie: {e}", error=True)
+                            # Tijdelijk overslaan en later opnieuw proberen
+                            dfplayer_guard.failure(e)
+
+                    heap_probe.stage(STAGE_MAP)
 
                     # Check PEP modus eerst (heeft prioriteit over normale LED)
                     pep_handled = handle_pep_mode(breath_value)
+                    heap_probe.stage(STAGE_LED)
 
-                    if settings.settings["control_mode"] == "joystick":
-                        x, y = 128, 128
+                    control_mode = settings.settings["control_mode"]
+                    if control_mode == "joystick" or control_mode == "hybrid":
+                        # Hybrid: joystick uitslag en drempelknoppen samen in één report
+                        x, y = AXIS_CENTER, AXIS_CENTER
                         deadzone = settings.settings["deadzone"]
                         is_blowing = breath_value > deadzone
                         is_inhaling = breath_value < -deadzone
@@ -603,12 +1121,22 @@ while True:
                         elif is_inhaling: current_direction = settings.settings["inhale_direction"]
 
                         if current_direction:
-                            mapped_value = map_range(breath_value, -1.0, 1.0, 0, 255)
+                            mapped_value = map_range(breath_value, -1.0, 1.0, 0, AXIS_MAX)
                             if current_direction in ["up", "down"]: y = mapped_value
                             elif current_direction in ["left", "right"]: x = mapped_value
+                        breath_mask = breath_buttons_mask(breath_value) if control_mode == "hybrid" else 0
+                        buttons = compose_buttons(breath_mask, control_mode, now_ms)
+
+                        # Extra buizen elk op hun eigen as, in hetzelfde report
+                        for channel, axis, sign, _, _, _, _ in extra_sensor_map:
+                            if axis == "y": y = extra_sensor_axis_value(channel.aligned(now_ms), sign)
+                            elif axis == "x": x = extra_sensor_axis_value(channel.aligned(now_ms), sign)
+                        z, rz = breath_channel_axes(breath_value)
+                        heap_probe.stage(STAGE_MAP)
 
                         if gamepad:
-                            gamepad.move_joysticks(x=y, y=x)  # x en y omgewisseld
+                            gamepad.set_state(x=y, y=x, buttons=buttons, z=z, rz=rz)  # x en y omgewisseld
+                        heap_probe.stage(STAGE_HID)
 
                         if is_blowing: set_status_color((0, 255, 0))
                         elif is_inhaling: set_status_color((255, 0, 0))
@@ -656,36 +1184,82 @@ while True:
                                 set_led_color_from_settings()
 
                             if new_breath_state != last_breath_state or new_breath_state != "neutral":
-                                 led_ring.show()
+                                 show_ring()
                             last_breath_state = new_breath_state
+                        heap_probe.stage(STAGE_LED)
 
-                    elif settings.settings["control_mode"] == "buttons":
-                        # Gamepad knoppen modus
+                    elif control_mode == "buttons":
+                        # Gamepad knoppen modus (knoppen worden losgelaten in de deadzone)
                         handle_gamepad_buttons(breath_value)
-
-                        # Release alle knoppen als we in de deadzone zijn
-                        if abs(breath_value) < settings.settings["deadzone"]:
-                            if gamepad:
-                                gamepad.release_all_buttons()
+                        heap_probe.stage(STAGE_HID)
 
                         # Status LED voor knoppen modus
                         if abs(breath_value) > settings.settings["deadzone"]:
                             set_status_color((255, 255, 0))  # Geel voor actieve knop
                         else:
                             set_status_color((0, 0, 255))   # Blauw voor neutraal
+                        heap_probe.stage(STAGE_LED)
+
+                    heap_probe.end_sample()
+                    if abs(breath_value) > settings.settings["deadzone"]:
+                        last_breath_activity_ms = ticks_ms()
+                        scheduler.activity()
 
                 except (ValueError, UnicodeError) as e:
+                    perf_stats.parse_errors += 1
                     debug_print(f"Error parsing UART data: {e}")
+                    consecutive_parse_errors += 1
+                    if consecutive_parse_errors >= UART_MAX_PARSE_ERRORS:
+                        consecutive_parse_errors = 0
+                        flush_uart()
                 except Exception as e:
-                    debug_print(f"General error in UART processing: {e}")
-
-        if time.monotonic() - last_uart_success > 2.0:
+                    log_event(f"General error in UART processing: {e}", error=True)
+
+        # Laat hold tijden en pulsen op tijd aflopen, ook zonder nieuwe samples
+        blow_output.tick(ticks_ms())
+        inhale_output.tick(ticks_ms())
+        if blow_output.value or inhale_output.value:
+            scheduler.activity()
+
+        # Knop van een gebaar loslaten zodra de druktijd voorbij is
+        if gesture_buttons and ticks_diff(ticks_ms(), gesture_release_at) >= 0:
+            gesture_buttons = 0
+            if gamepad:
+                # Zelfde samenstelling als het normale report, zonder de gebaarknop
+                gamepad.set_state(buttons=compose_buttons(held_buttons, settings.settings["control_mode"], ticks_ms()))
+        if gesture_buttons:
+            scheduler.activity()
+
+        uart_silence = time.monotonic() - last_uart_success
+        if (uart_silence > UART_RESYNC_AFTER_S and uart_guard.available()
+                and (uart_reinit_at is None or ticks_diff(ticks_ms(), uart_reinit_at) >= 0)):
+            reinit_uart()
+
+        if uart_silence > 2.0:
             set_status_color((64, 0, 64)) # Purple for timeout
 
+        # Geplande gc.collect() tijdens rust, zodat een collectie niet midden in een ademhaling valt
+        if settings.settings["gc_idle_collect"]:
+            now_ms = ticks_ms()
+            if ticks_diff(now_ms, last_breath_activity_ms) >= GC_IDLE_SETTLE_MS:
+                heap_probe.idle_collect(now_ms, int(settings.settings["gc_idle_interval"] * 1000))
+
+        # available() beëindigt de pauze na een trip, zodat "disabled" weer vrijkomt
+        if loop_guard.available():
+            loop_guard.success()
+
     except Exception as e:
-        debug_print(f"Main loop error: {e}")
+        perf_stats.main_loop_errors += 1
+        log_event(f"Main loop error: {e}", error=True)
         set_status_color((255, 64, 0)) # Orange for error
-        time.sleep(1)
+        # Geen seconde stilstand meer; alleen bij een reeks fouten kort pauzeren
+        if loop_guard.failure(e):
+            time.sleep(0.05)
+
+    pump_cdc()
+    perf_stats.record_loop(time.monotonic_ns() - loop_start_ns)
 
-    # Verwijder de sleep om communicatie te verbeteren
-    # time.sleep(0.01)
+    # Geen vaste sleep: volle snelheid tijdens ademactiviteit of serieel verkeer,
+    # korte pauzes (met vroeg ontwaken op nieuwe bytes) als het stil is
+    scheduler.enabled = settings.settings["idle_sleep_enabled"]
+    scheduler.idle_wait(uart, usb_cdc.data, *extra_sensor_streams)
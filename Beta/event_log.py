@@ -0,0 +1,131 @@
+import os
+import time
+
+try:
+    import storage
+except ImportError:
+    storage = None
+
+# Standaard waarden voor het persistente logboek
+LOG_FILENAME = "/log.txt"
+ROTATED_LOG_FILENAME = "/log.old.txt"
+LOG_MAX_BYTES = 8 * 1024   # Daarna wordt log.txt geroteerd naar log.old.txt
+LOG_RING_SIZE = 64         # Aantal regels dat in RAM bewaard wordt
+
+
+def filesystem_writable():
+    """Return True when CircuitPython itself may write to the root filesystem."""
+    if storage is None:
+        return True
+    try:
+        return not storage.getmount("/").readonly
+    except Exception:
+        return False
+
+
+class EventLog:
+    """In-RAM ring buffer of log lines, flushed to a bounded, rotating file.
+
+    Logging a line never touches the filesystem. ``flush()`` writes every
+    line that has not been persisted yet in a single append, and only when the
+    filesystem is writable (at boot, or while ``settings.save_settings`` holds
+    it writable). Lines logged with ``error=True`` trigger a flush attempt.
+    """
+
+    def __init__(self, capacity=LOG_RING_SIZE, filename=LOG_FILENAME,
+                 rotated_filename=ROTATED_LOG_FILENAME, max_bytes=LOG_MAX_BYTES):
+        self._lines = [None] * capacity
+        self._capacity = capacity
+        self._next = 0
+        self._count = 0
+        self._unflushed = 0
+        self.filename = filename
+        self.rotated_filename = rotated_filename
+        self.max_bytes = max_bytes
+        self.dropped = 0        # Regels die uit de ring vielen voordat ze geflusht waren
+        self.flush_failures = 0
+
+    def log(self, message, error=False):
+        """Store a timestamped line; attempt a flush when it is an error."""
+        line = "[{:.3f}] {}".format(time.monotonic(), message)
+        self._lines[self._next] = line
+        self._next = (self._next + 1) % self._capacity
+        if self._count < self._capacity:
+            self._count += 1
+        if self._unflushed < self._capacity:
+            self._unflushed += 1
+        else:
+            self.dropped += 1
+        if error:
+            self.flush()
+
+    def entries(self):
+        """Return the buffered lines, oldest first."""
+        start = (self._next - self._count) % self._capacity
+        return [self._lines[(start + i) % self._capacity] for i in range(self._count)]
+
+    def clear(self):
+        for i in range(self._capacity):
+            self._lines[i] = None
+        self._next = 0
+        self._count = 0
+        self._unflushed = 0
+        self.dropped = 0
+        self.flush_failures = 0
+
+    @property
+    def pending(self):
+        """Number of buffered lines not yet written to flash."""
+        return self._unflushed
+
+    def snapshot(self):
+        return {
+            "buffered": self._count,
+            "pending": self._unflushed,
+            "dropped": self.dropped,
+            "flush_failures": self.flush_failures,
+        }
+
+    def flush(self):
+        """Append all unflushed lines to the log file in one write.
+
+        Returns True when nothing was pending or the write succeeded. Never
+        raises: a read-only filesystem just leaves the lines pending.
+        """
+        if not self._unflushed:
+            return True
+        if not filesystem_writable():
+            return False
+
+        start = (self._next - self._unflushed) % self._capacity
+        chunk = "\n".join(
+            [self._lines[(start + i) % self._capacity] for i in range(self._unflushed)]
+        ) + "\n"
+        try:
+            self._rotate_if_needed(len(chunk))
+            with open(self.filename, "a") as f:
+                f.write(chunk)
+            self._unflushed = 0
+            return True
+        except Exception:
+            self.flush_failures += 1
+            return False
+
+    def _rotate_if_needed(self, incoming):
+        try:
+            size = os.stat(self.filename)[6]
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        try:
+            os.remove(self.rotated_filename)
+        except OSError:
+            pass
+        os.rename(self.filename, self.rotated_filename)
+
+
+# Eén instantie per VM: boot.py en code.py draaien los van elkaar en krijgen elk
+# een eigen ring. Regels uit boot.py staan daarom alleen in het logbestand
+# (geflusht aan het eind van boot.py), niet in GET:log.
+event_log = EventLog()
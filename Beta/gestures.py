@@ -0,0 +1,209 @@
+from ticks import ticks_add, ticks_diff
+from gpio_output import BLOW, INHALE
+
+# Gebeurtenissen (index in GESTURE_NAMES)
+NONE = 0
+PUFF_SHORT = 1
+PUFF_LONG = 2
+PUFF_DOUBLE = 3
+SIP_HARD = 4
+SIP_PUFF = 5
+GESTURE_NAMES = ("none", "puff_short", "puff_long", "puff_double", "sip_hard", "sip_puff")
+
+# Interne toestanden
+_IDLE = 0
+_PUFF = 1        # Eerste puff bezig
+_PUFF_WAIT = 2   # Korte puff losgelaten, wacht op een mogelijke tweede
+_SIP = 3         # Zuigen bezig
+_SIP_WAIT = 4    # Zuigen losgelaten, wacht op een mogelijke puff
+_HELD = 5        # Gebaar al gemeld, wacht tot de puff wordt losgelaten
+
+
+def gesture_bit(event):
+    return 1 << event
+
+
+class GestureRecognizer:
+    """Sip-and-puff gesture state machine driven by the breath sample stream.
+
+    ``update(value, now_ms)`` is called for every sample with a ticks_ms
+    timestamp and returns one of the event constants (``NONE`` most of the
+    time). It only works on ints and floats already held in attributes, so
+    it does not allocate.
+
+    Only gestures in ``enabled`` (a bitmask of ``gesture_bit(event)``) are
+    reported, and each event is emitted as soon as it can no longer turn
+    into another enabled gesture. Worst-case decision latency, measured
+    from the moment the gesture is physically complete:
+
+    - PUFF_LONG: ``long_ms`` after the puff starts, while still blowing.
+    - PUFF_DOUBLE: at the start of the second puff (no extra delay).
+    - SIP_PUFF: at the start of the puff (no extra delay).
+    - PUFF_SHORT: on release; ``double_gap_ms`` later only if PUFF_DOUBLE
+      is enabled.
+    - SIP_HARD: when the hard threshold is crossed; only if SIP_PUFF is
+      enabled, ``sip_puff_gap_ms`` after the sip is released.
+
+    Add one sample period to each of these, because deadlines are only
+    checked when a sample arrives.
+    """
+
+    def __init__(self):
+        self.enabled = 0
+        self.puff_threshold = 0.3
+        self.sip_threshold = 0.3
+        self.hard_sip_threshold = 0.7
+        self.hysteresis = 0.05
+        self.long_ms = 600
+        self.double_gap_ms = 250
+        self.sip_puff_gap_ms = 400
+        self.reset()
+
+    def reset(self):
+        self._state = _IDLE
+        self._start = 0
+        self._deadline = 0
+        self._hard = False
+        self._hard_reported = False
+
+    def _on(self, event):
+        return self.enabled & (1 << event)
+
+    def update(self, value, now_ms):
+        state = self._state
+        puff_on = value > self.puff_threshold
+        puff_off = value < self.puff_threshold - self.hysteresis
+        sip_on = value < -self.sip_threshold
+        sip_off = value > -(self.sip_threshold - self.hysteresis)
+
+        if state == _IDLE:
+            if puff_on:
+                self._start_puff(now_ms)
+            elif sip_on:
+                self._start_sip()
+                return self._sip_step(value, now_ms, sip_off)
+            return NONE
+
+        if state == _PUFF:
+            if self._on(PUFF_LONG) and ticks_diff(now_ms, self._start) >= self.long_ms:
+                self._state = _HELD
+                return PUFF_LONG
+            if puff_off:
+                if ticks_diff(now_ms, self._start) >= self.long_ms:
+                    # Lang vastgehouden zonder puff_long actie: geen korte puff
+                    self._state = _IDLE
+                    return NONE
+                if self._on(PUFF_DOUBLE):
+                    self._state = _PUFF_WAIT
+                    self._deadline = ticks_add(now_ms, self.double_gap_ms)
+                    return NONE
+                self._state = _IDLE
+                return PUFF_SHORT if self._on(PUFF_SHORT) else NONE
+            return NONE
+
+        if state == _PUFF_WAIT:
+            if puff_on:
+                self._state = _HELD
+                return PUFF_DOUBLE
+            if sip_on:
+                # De korte puff eerst melden; het zuigen wordt vanaf de volgende sample gevolgd
+                self._start_sip()
+                if self._on(PUFF_SHORT):
+                    return PUFF_SHORT
+                return self._sip_step(value, now_ms, sip_off)
+            if ticks_diff(now_ms, self._deadline) >= 0:
+                self._state = _IDLE
+                return PUFF_SHORT if self._on(PUFF_SHORT) else NONE
+            return NONE
+
+        if state == _SIP:
+            return self._sip_step(value, now_ms, sip_off)
+
+        if state == _SIP_WAIT:
+            if puff_on:
+                self._state = _HELD
+                return SIP_PUFF
+            pending_hard = self._hard and not self._hard_reported and self._on(SIP_HARD)
+            if sip_on:
+                self._start_sip()
+                if pending_hard:
+                    return SIP_HARD
+                return self._sip_step(value, now_ms, sip_off)
+            if ticks_diff(now_ms, self._deadline) >= 0:
+                self._state = _IDLE
+                return SIP_HARD if pending_hard else NONE
+            return NONE
+
+        # _HELD
+        if puff_off:
+            self._state = _IDLE
+        return NONE
+
+    def _start_puff(self, now_ms):
+        self._state = _PUFF
+        self._start = now_ms
+
+    def _start_sip(self):
+        self._state = _SIP
+        self._hard = False
+        self._hard_reported = False
+
+    def _sip_step(self, value, now_ms, sip_off):
+        if value < -self.hard_sip_threshold and not self._hard:
+            self._hard = True
+            if not self._on(SIP_PUFF) and self._on(SIP_HARD):
+                # Zonder sip_puff kan een harde sip meteen gemeld worden
+                self._hard_reported = True
+                return SIP_HARD
+        if sip_off:
+            if self._on(SIP_PUFF):
+                self._state = _SIP_WAIT
+                self._deadline = ticks_add(now_ms, self.sip_puff_gap_ms)
+            else:
+                self._state = _IDLE
+        return NONE
+
+# Acties die aan een gebaar gekoppeld kunnen worden ("none", "button:N",
+# "gpio:blow", "gpio:inhale", "dfplayer:next", "profile:N", "profile:next").
+# Ze worden bij het instellen
+# omgezet naar (soort, argument) zodat er per gebaar niets geparsed wordt.
+ACTION_NONE = 0
+ACTION_BUTTON = 1
+ACTION_GPIO = 2
+ACTION_DFPLAYER_NEXT = 3
+ACTION_PROFILE = 4        # Argument is het slot, of PROFILE_NEXT
+PROFILE_NEXT = -1
+
+_NO_ACTION = (ACTION_NONE, 0)
+
+
+def compile_action(action):
+    """Turn an action string from the settings into an (kind, arg) pair."""
+    if not isinstance(action, str) or action == "none":
+        return _NO_ACTION
+    kind, _, arg = action.partition(":")
+    if kind == "button" and arg.isdigit() and 1 <= int(arg) <= 8:
+        return (ACTION_BUTTON, 1 << (int(arg) - 1))
+    if kind == "gpio" and arg == "blow":
+        return (ACTION_GPIO, BLOW)
+    if kind == "gpio" and arg == "inhale":
+        return (ACTION_GPIO, INHALE)
+    if kind == "dfplayer" and arg == "next":
+        return (ACTION_DFPLAYER_NEXT, 0)
+    if kind == "profile" and arg == "next":
+        return (ACTION_PROFILE, PROFILE_NEXT)
+    if kind == "profile" and arg.isdigit():
+        return (ACTION_PROFILE, int(arg))
+    return _NO_ACTION
+
+
+def compile_actions(actions):
+    """Action table indexed by gesture event, plus the mask of gestures in use."""
+    table = [_NO_ACTION]
+    enabled = 0
+    for event in range(1, len(GESTURE_NAMES)):
+        compiled = compile_action(actions.get(GESTURE_NAMES[event], "none"))
+        table.append(compiled)
+        if compiled[0] != ACTION_NONE:
+            enabled |= gesture_bit(event)
+    return tuple(table), enabled
@@ -0,0 +1,66 @@
+from ticks import ticks_add, ticks_diff
+
+BLOW = 1
+INHALE = -1
+
+
+class TimedOutput:
+    """Threshold-driven digital output with hysteresis and a minimum on-time.
+
+    ``update()`` is fed every breath sample. The output switches on when the
+    sample passes ``threshold`` (in the output's direction) and only counts
+    as released again once it falls back by ``hysteresis``, so sensor noise
+    around the threshold does not make the pin chatter. Every activation
+    keeps the pin high for at least ``hold_ms`` (the "Hold tijd" setting).
+    ``pulse()`` adds a timed pulse on top, e.g. as a PEP reward.
+
+    Timing uses ticks_ms and never sleeps; ``tick()`` must be called every
+    loop pass so holds and pulses end on time even without new samples.
+    The pin is only written when its level actually changes.
+    """
+
+    def __init__(self, io, direction=BLOW):
+        self._io = io
+        self._direction = direction
+        self._active = False
+        self._release_at = 0
+        self._timed = False
+        self.value = False
+        self.edges = 0
+        io.value = False
+
+    def _set(self, value):
+        if value != self.value:
+            self._io.value = value
+            self.value = value
+            self.edges += 1
+
+    def update(self, breath_value, threshold, hysteresis, hold_ms, now_ms, enabled=True):
+        level = breath_value * self._direction
+        limit = threshold * self._direction
+        if not enabled:
+            self._active = False
+        elif self._active:
+            if level < limit - hysteresis:
+                self._active = False
+        elif level > limit:
+            self._active = True
+            if hold_ms > 0:
+                self._extend(ticks_add(now_ms, hold_ms))
+        self.tick(now_ms)
+
+    def pulse(self, duration_ms, now_ms):
+        """Keep the output high for at least ``duration_ms`` from now."""
+        if duration_ms > 0:
+            self._extend(ticks_add(now_ms, duration_ms))
+            self.tick(now_ms)
+
+    def _extend(self, release_at):
+        if not self._timed or ticks_diff(release_at, self._release_at) > 0:
+            self._release_at = release_at
+            self._timed = True
+
+    def tick(self, now_ms):
+        if self._timed and ticks_diff(self._release_at, now_ms) <= 0:
+            self._timed = False
+        self._set(self._active or self._timed)
@@ -0,0 +1,132 @@
+import json
+
+try:
+    from microcontroller import nvm
+except ImportError:
+    nvm = None
+
+# Eén specificatie voor zowel boot.py (report descriptor) als
+# hid_xac_gamepad.Gamepad (report layout), zodat die nooit uit elkaar lopen.
+
+REPORT_ID = 5
+USAGE_PAGE = 0x01   # Generic Desktop Ctrls
+USAGE = 0x05        # GamePad
+
+USAGE_X = 0x30
+USAGE_Y = 0x31
+USAGE_Z = 0x32
+USAGE_RZ = 0x35
+
+DEFAULT_LAYOUT = "standard"
+
+# boot.py legt in nvm vast welke layout echt is ingeschakeld; settings.json kan
+# daarna wijzigen (SAVE + soft reload) terwijl de descriptor pas bij een harde
+# reset verandert.
+NVM_LAYOUT_OFFSET = 0
+NVM_LAYOUT_MAGIC = 0xA5
+
+LAYOUTS = {
+    # Origineel XAC formaat: 8-bit X/Y + 8 knoppen (3 bytes)
+    "standard": {"axes": (USAGE_X, USAGE_Y), "axis_bits": 8, "buttons": 8},
+    # 16-bit X/Y plus aparte assen voor blazen (Z) en zuigen (Rz) + 8 knoppen (9 bytes)
+    "extended": {"axes": (USAGE_X, USAGE_Y, USAGE_Z, USAGE_RZ), "axis_bits": 16, "buttons": 8},
+}
+LAYOUT_NAMES = ("standard", "extended")  # Volgorde = index in nvm, niet wijzigen
+
+
+def get_layout(name):
+    """Return the layout spec for ``name``, falling back to the default."""
+    return LAYOUTS.get(name, LAYOUTS[DEFAULT_LAYOUT])
+
+
+def _logical_maximum(value):
+    if value <= 0x7F:
+        return (0x25, value)
+    if value <= 0x7FFF:
+        return (0x26, value & 0xFF, value >> 8)
+    return (0x27, value & 0xFF, (value >> 8) & 0xFF, (value >> 16) & 0xFF, value >> 24)
+
+
+def build_report_descriptor(layout):
+    """Build the HID report descriptor bytes for a layout spec."""
+    axis_bits = layout["axis_bits"]
+    buttons = layout["buttons"]
+    d = [
+        0x05, USAGE_PAGE,        # Usage Page (Generic Desktop Ctrls)
+        0x09, USAGE,             # Usage (GamePad)
+        0xA1, 0x01,              # Collection (Application)
+        0x85, REPORT_ID,         #   Report ID
+        0x05, 0x01,              #   Usage Page (Generic Desktop Ctrls)
+    ]
+    for usage in layout["axes"]:
+        d.extend((0x09, usage))  #   Usage (X / Y / Z / Rz)
+    d.extend((0x15, 0x00))       #   Logical Minimum (0)
+    d.extend(_logical_maximum((1 << axis_bits) - 1))
+    d.extend((
+        0x75, axis_bits,         #   Report Size
+        0x95, len(layout["axes"]),  # Report Count
+        0x81, 0x02,              #   Input (Data,Var,Abs)
+        0x05, 0x09,              #   Usage Page (Button)
+        0x19, 0x01,              #   Usage Minimum (0x01)
+        0x29, buttons,           #   Usage Maximum
+        0x15, 0x00,              #   Logical Minimum (0)
+        0x25, 0x01,              #   Logical Maximum (1)
+        0x75, 0x01,              #   Report Size (1)
+        0x95, buttons,           #   Report Count
+        0x81, 0x02,              #   Input (Data,Var,Abs)
+        0xC0,                    # End Collection
+    ))
+    return bytes(d)
+
+
+def report_length(layout):
+    """Input report length in bytes (without the report ID)."""
+    return len(layout["axes"]) * layout["axis_bits"] // 8 + (layout["buttons"] + 7) // 8
+
+
+def report_format(layout):
+    """struct format string for packing one input report."""
+    axis = "B" if layout["axis_bits"] == 8 else "H"
+    return "<" + axis * len(layout["axes"]) + "B" * ((layout["buttons"] + 7) // 8)
+
+
+def read_layout_setting(filename="/settings.json"):
+    """Read ``hid_report_layout`` straight from the settings file.
+
+    Used by boot.py, which cannot import settings.py (that module may try to
+    write the file). Any problem falls back to the default layout.
+    """
+    try:
+        with open(filename, "r") as f:
+            name = json.load(f).get("hid_report_layout", DEFAULT_LAYOUT)
+    except Exception:
+        return DEFAULT_LAYOUT
+    return name if name in LAYOUTS else DEFAULT_LAYOUT
+
+
+def record_enabled_layout(name):
+    """Store the layout boot.py enabled in nvm (only written when it changed)."""
+    if nvm is None:
+        return False
+    record = bytes((NVM_LAYOUT_MAGIC, LAYOUT_NAMES.index(name)))
+    try:
+        if nvm[NVM_LAYOUT_OFFSET:NVM_LAYOUT_OFFSET + 2] != record:
+            nvm[NVM_LAYOUT_OFFSET:NVM_LAYOUT_OFFSET + 2] = record
+        return True
+    except Exception:
+        return False
+
+
+def read_enabled_layout():
+    """Layout of the HID device boot.py enabled, as recorded in nvm.
+
+    Falls back to the settings file when there is no (valid) record.
+    """
+    if nvm is not None:
+        try:
+            magic, index = nvm[NVM_LAYOUT_OFFSET], nvm[NVM_LAYOUT_OFFSET + 1]
+            if magic == NVM_LAYOUT_MAGIC and index < len(LAYOUT_NAMES):
+                return LAYOUT_NAMES[index]
+        except Exception:
+            pass
+    return read_layout_setting()
@@ -7,14 +7,27 @@ import time
 
 from adafruit_hid import find_device
 
+import hid_descriptor
+
 class Gamepad:
-    def __init__(self, devices):
-        self._gamepad_device = find_device(devices, usage_page=0x1, usage=0x05)
-        self._report = bytearray(3)
-        self._last_report = bytearray(3)
-        self._joy_x = 128
-        self._joy_y = 128
+    def __init__(self, devices, layout=hid_descriptor.DEFAULT_LAYOUT):
+        self._gamepad_device = find_device(devices, usage_page=hid_descriptor.USAGE_PAGE,
+                                           usage=hid_descriptor.USAGE)
+        spec = hid_descriptor.get_layout(layout)
+        self._format = hid_descriptor.report_format(spec)
+        self.extra_axes = len(spec["axes"]) > 2
+        length = hid_descriptor.report_length(spec)
+        self._report = bytearray(length)
+        self._last_report = bytearray(length)
+        self.axis_max = (1 << spec["axis_bits"]) - 1
+        self.axis_center = (self.axis_max + 1) // 2
+        self._joy_x = self.axis_center
+        self._joy_y = self.axis_center
+        self._joy_z = 0
+        self._joy_rz = 0
         self._buttons_state = 0
+        self.reports_sent = 0
+        self.reports_suppressed = 0
 
         try:
             self.reset_all()
@@ -47,19 +60,51 @@ class Gamepad:
             self._joy_y = self._validate_joystick_value(y)
         self._send()
 
+    def set_state(self, x=None, y=None, buttons=None, z=None, rz=None):
+        """Update axes and the button bitmask together and send one report.
+
+        ``buttons`` is the full bitmask (bit 0 = button 1). ``z`` and ``rz``
+        only exist in the extended layout and are ignored otherwise.
+        """
+        if x is not None:
+            self._joy_x = self._validate_joystick_value(x)
+        if y is not None:
+            self._joy_y = self._validate_joystick_value(y)
+        if z is not None:
+            self._joy_z = self._validate_joystick_value(z)
+        if rz is not None:
+            self._joy_rz = self._validate_joystick_value(rz)
+        if buttons is not None:
+            self._buttons_state = buttons & 0xFF
+        self._send()
+
     def reset_all(self):
         self._buttons_state = 0
-        self._joy_x = 128
-        self._joy_y = 128
+        self._joy_x = self.axis_center
+        self._joy_y = self.axis_center
+        self._joy_z = 0
+        self._joy_rz = 0
         self._send(always=True)
 
     def _send(self, always=False):
-        struct.pack_into('<BBB', self._report, 0,
-                         self._joy_y, self._joy_x, self._buttons_state)
+        if self.extra_axes:
+            struct.pack_into(self._format, self._report, 0,
+                             self._joy_y, self._joy_x, self._joy_z, self._joy_rz,
+                             self._buttons_state)
+        else:
+            struct.pack_into(self._format, self._report, 0,
+                             self._joy_y, self._joy_x, self._buttons_state)
 
         if always or self._last_report != self._report:
             self._gamepad_device.send_report(self._report)
             self._last_report[:] = self._report
+            self.reports_sent += 1
+        else:
+            self.reports_suppressed += 1
+
+    def reset_counters(self):
+        self.reports_sent = 0
+        self.reports_suppressed = 0
 
     @staticmethod
     def _validate_button_number(button):
@@ -67,8 +112,7 @@ class Gamepad:
             raise ValueError("Button number must in range 1 to 8")
         return button
 
-    @staticmethod
-    def _validate_joystick_value(value):
-        if not 0 <= value <= 255:
-            raise ValueError("Joystick value must be in range 0 to 255")
+    def _validate_joystick_value(self, value):
+        if not 0 <= value <= self.axis_max:
+            raise ValueError("Joystick value must be in range 0 to %d" % self.axis_max)
         return value 
\ No newline at end of file
@@ -0,0 +1,210 @@
+import gc
+import time
+
+from ticks import ticks_ms, ticks_diff
+
+# Bovengrenzen (microseconden) van de loop-tijd histogram buckets.
+# De laatste bucket telt alles daarboven.
+LOOP_BUCKETS_US = (250, 500, 1000, 2000, 5000, 10000, 50000)
+
+
+class PerfStats:
+    """Cheap runtime counters for the main loop.
+
+    Everything is a plain integer that the hot path increments directly
+    (``perf_stats.uart_samples += 1``); rates and averages are only computed
+    in ``snapshot()``, when a host asks for them with ``GET:stats``.
+    """
+
+    def __init__(self):
+        self.loop_histogram = [0] * (len(LOOP_BUCKETS_US) + 1)
+        self.reset()
+
+    def reset(self):
+        self.started_ns = time.monotonic_ns()
+        self.loop_iterations = 0
+        self.loop_total_us = 0
+        self.loop_max_us = 0
+        self.uart_samples = 0
+        self.parse_errors = 0
+        self.samples_coalesced = 0   # Oudere regels overgeslagen omdat er al een nieuwere klaar stond
+        self.samples_dropped = 0     # Onvolledige regels (geen newline) weggegooid
+        self.led_shows = 0
+        self.cdc_bytes = 0
+        self.uart_flushes = 0        # Input buffer geleegd na opeenvolgende parse fouten
+        self.uart_reinits = 0        # UART opnieuw geinitialiseerd na stilte
+        self.main_loop_errors = 0
+        for i in range(len(self.loop_histogram)):
+            self.loop_histogram[i] = 0
+
+    def record_loop(self, elapsed_ns):
+        """Account one main loop pass that took ``elapsed_ns``."""
+        elapsed_us = elapsed_ns // 1000
+        self.loop_iterations += 1
+        self.loop_total_us += elapsed_us
+        if elapsed_us > self.loop_max_us:
+            self.loop_max_us = elapsed_us
+        bucket = 0
+        for limit in LOOP_BUCKETS_US:
+            if elapsed_us < limit:
+                break
+            bucket += 1
+        self.loop_histogram[bucket] += 1
+
+    def snapshot(self):
+        """Return all counters plus derived rates as a JSON-serialisable dict."""
+        elapsed_s = (time.monotonic_ns() - self.started_ns) / 1e9
+        if elapsed_s <= 0:
+            elapsed_s = 1e-9
+        loops = self.loop_iterations
+        return {
+            "elapsed_s": round(elapsed_s, 3),
+            "loop_iterations": loops,
+            "loops_per_s": round(loops / elapsed_s, 1),
+            "loop_avg_us": self.loop_total_us // loops if loops else 0,
+            "loop_max_us": self.loop_max_us,
+            "loop_histogram_us": {
+                "buckets": list(LOOP_BUCKETS_US),
+                "counts": list(self.loop_histogram),
+            },
+            "uart_samples": self.uart_samples,
+            "uart_samples_per_s": round(self.uart_samples / elapsed_s, 1),
+            "parse_errors": self.parse_errors,
+            "samples_coalesced": self.samples_coalesced,
+            "samples_dropped": self.samples_dropped,
+            "led_shows": self.led_shows,
+            "cdc_bytes": self.cdc_bytes,
+            "uart_flushes": self.uart_flushes,
+            "uart_reinits": self.uart_reinits,
+            "main_loop_errors": self.main_loop_errors,
+        }
+
+
+# Stappen in de verwerking van een sample, voor heap_probe.stage()
+STAGE_PARSE = 0
+STAGE_MAP = 1
+STAGE_HID = 2
+STAGE_LED = 3
+STAGE_TELEMETRY = 4
+STAGE_NAMES = ("parse", "map", "hid", "led", "telemetry")
+
+
+class HeapProbe:
+    """Opt-in heap instrumentation for the per-sample path.
+
+    ``begin_sample()`` and ``stage()`` sample ``gc.mem_free()`` and attribute
+    the drop in free memory to the stage that just ran. When free memory goes
+    *up* instead, an automatic collection happened inside that stage; its
+    duration (in ticks_ms) is recorded as an upper bound of the GC pause.
+    All timing uses ticks_ms so the probe itself does not allocate.
+    When ``enabled`` is False every call returns immediately.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stage_bytes = [0] * len(STAGE_NAMES)
+        self.reset()
+
+    def reset(self):
+        self.samples = 0
+        self.sample_bytes = 0
+        self.sample_bytes_max = 0
+        for i in range(len(self.stage_bytes)):
+            self.stage_bytes[i] = 0
+        self.auto_gc_count = 0
+        self.auto_gc_pause_max_ms = 0
+        self.auto_gc_last_ms = None
+        self.auto_gc_interval_ms = 0   # Tijd tussen de laatste twee automatische collecties
+        self.idle_gc_count = 0
+        self.idle_gc_total_ms = 0
+        self.idle_gc_max_ms = 0
+        self.last_idle_gc_ms = ticks_ms()
+        self.mem_free_min = gc.mem_free()
+        self._mark_free = 0
+        self._mark_ms = 0
+        self._sample_bytes = 0
+
+    def begin_sample(self):
+        if not self.enabled:
+            return
+        self._mark_free = gc.mem_free()
+        self._mark_ms = ticks_ms()
+        self._sample_bytes = 0
+
+    def stage(self, stage):
+        """Attribute the allocations since the previous mark to ``stage``."""
+        if not self.enabled:
+            return
+        free = gc.mem_free()
+        now = ticks_ms()
+        used = self._mark_free - free
+        if used >= 0:
+            self.stage_bytes[stage] += used
+            self._sample_bytes += used
+        else:
+            # Geheugen kwam vrij: er liep een automatische gc.collect() in deze stap
+            self.auto_gc_count += 1
+            pause = ticks_diff(now, self._mark_ms)
+            if pause > self.auto_gc_pause_max_ms:
+                self.auto_gc_pause_max_ms = pause
+            if self.auto_gc_last_ms is not None:
+                self.auto_gc_interval_ms = ticks_diff(now, self.auto_gc_last_ms)
+            self.auto_gc_last_ms = now
+        if free < self.mem_free_min:
+            self.mem_free_min = free
+        self._mark_free = free
+        self._mark_ms = now
+
+    def end_sample(self):
+        if not self.enabled:
+            return
+        self.samples += 1
+        self.sample_bytes += self._sample_bytes
+        if self._sample_bytes > self.sample_bytes_max:
+            self.sample_bytes_max = self._sample_bytes
+
+    def idle_collect(self, now_ms, interval_ms):
+        """Run gc.collect() if the last idle collection is ``interval_ms`` ago.
+
+        Only call this while there is no breath activity, so collections
+        happen between breaths instead of whenever the heap runs out.
+        Returns True when a collection ran.
+        """
+        if ticks_diff(now_ms, self.last_idle_gc_ms) < interval_ms:
+            return False
+        start = ticks_ms()
+        gc.collect()
+        end = ticks_ms()
+        pause = ticks_diff(end, start)
+        self.idle_gc_count += 1
+        self.idle_gc_total_ms += pause
+        if pause > self.idle_gc_max_ms:
+            self.idle_gc_max_ms = pause
+        self.last_idle_gc_ms = end
+        return True
+
+    def snapshot(self):
+        samples = self.samples
+        stages = {}
+        for i, name in enumerate(STAGE_NAMES):
+            stages[name] = self.stage_bytes[i] // samples if samples else 0
+        return {
+            "enabled": self.enabled,
+            "mem_free": gc.mem_free(),
+            "mem_free_min": self.mem_free_min,
+            "samples": samples,
+            "bytes_per_sample": self.sample_bytes // samples if samples else 0,
+            "bytes_per_sample_max": self.sample_bytes_max,
+            "bytes_per_stage": stages,
+            "auto_gc_count": self.auto_gc_count,
+            "auto_gc_pause_max_ms": self.auto_gc_pause_max_ms,
+            "auto_gc_interval_ms": self.auto_gc_interval_ms,
+            "idle_gc_count": self.idle_gc_count,
+            "idle_gc_avg_ms": self.idle_gc_total_ms // self.idle_gc_count if self.idle_gc_count else 0,
+            "idle_gc_max_ms": self.idle_gc_max_ms,
+        }
+
+
+# Gedeelde instanties voor code.py
+perf_stats = PerfStats()
+heap_probe = HeapProbe()
@@ -0,0 +1,113 @@
+import json
+import settings
+
+try:
+    import copy
+except ImportError:
+    copy = None
+
+PROFILES_FILENAME = "/profiles.json"
+PROFILE_SLOTS = 4  # Slot 1..4 staan in profiles.json; slot 0 zijn de instellingen uit settings.json
+
+
+def _default_settings():
+    """Deep copy of DEFAULT_SETTINGS, so profiles never share nested dicts/lists."""
+    if copy is not None:
+        return copy.deepcopy(settings.DEFAULT_SETTINGS)
+    return json.loads(json.dumps(settings.DEFAULT_SETTINGS))
+
+
+class ProfileStore:
+    """Named settings profiles that can be switched without touching flash.
+
+    All slots are read and parsed once at startup into complete settings
+    dicts (defaults filled in), so ``activate()`` only swaps the
+    ``settings.settings`` reference. Slot 0 is always the dict loaded from
+    /settings.json. Only ``save_slot()`` writes /profiles.json.
+    """
+
+    def __init__(self, slots=PROFILE_SLOTS, filename=PROFILES_FILENAME):
+        self.filename = filename
+        self.names = ["default"] + [None] * slots
+        self._slots = [settings.settings] + [None] * slots
+        self.active = 0
+        self.switches = 0
+
+    @property
+    def count(self):
+        return len(self._slots)
+
+    def load(self):
+        """Parse /profiles.json into ready-to-use settings dicts."""
+        try:
+            with open(self.filename, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"No profiles loaded from '{self.filename}': {e}")
+            return False
+        stored = data.get("profiles") if isinstance(data, dict) else None
+        if not isinstance(stored, list):
+            print(f"No profiles loaded from '{self.filename}': unexpected format")
+            return False
+        for i, entry in enumerate(stored[:self.count - 1]):
+            # Lege of verkeerd gevormde slots overslaan; die mogen het opstarten niet blokkeren
+            if not isinstance(entry, dict) or not isinstance(entry.get("settings", {}), dict):
+                continue
+            profile = _default_settings()
+            profile.update(entry.get("settings", {}))
+            name = entry.get("name")
+            self._slots[i + 1] = profile
+            self.names[i + 1] = name if isinstance(name, str) and name else f"profile {i + 1}"
+        return True
+
+    def available(self, slot):
+        return 0 <= slot < self.count and self._slots[slot] is not None
+
+    def activate(self, slot):
+        """Make ``slot`` the live settings. Returns False for an empty slot."""
+        if not self.available(slot):
+            return False
+        settings.settings = self._slots[slot]
+        self.active = slot
+        self.switches += 1
+        return True
+
+    def next_slot(self):
+        """The next filled slot after the active one (wraps around)."""
+        for step in range(1, self.count + 1):
+            slot = (self.active + step) % self.count
+            if self._slots[slot] is not None:
+                return slot
+        return self.active
+
+    def save_slot(self, slot, name=None):
+        """Store the live settings in ``slot`` (1..N) and write /profiles.json."""
+        if not 1 <= slot < self.count:
+            return False
+        if slot == self.active:
+            profile = settings.settings
+        else:
+            # Losse kopie, zodat latere wijzigingen aan de actieve instellingen dit slot niet raken
+            profile = json.loads(json.dumps(settings.settings))
+        self._slots[slot] = profile
+        if name:
+            self.names[slot] = name
+        elif self.names[slot] is None:
+            self.names[slot] = f"profile {slot}"
+        return self._write()
+
+    def _write(self):
+        stored = []
+        for slot in range(1, self.count):
+            if self._slots[slot] is None:
+                stored.append(None)
+            else:
+                stored.append({"name": self.names[slot], "settings": self._slots[slot]})
+        return settings.write_json_file(self.filename, {"profiles": stored})
+
+    def summary(self):
+        return {"active": self.active, "names": self.names}
+
+
+# Gedeelde instantie voor code.py
+profiles = ProfileStore()
@@ -0,0 +1,91 @@
+from ticks import ticks_ms, ticks_add, ticks_diff
+
+try:
+    from microcontroller import watchdog
+    from watchdog import WatchDogMode
+except ImportError:
+    watchdog = None
+
+WATCHDOG_TIMEOUT_S = 5.0  # RP2040 staat maximaal ~8.3 s toe
+
+
+def start_watchdog(timeout=WATCHDOG_TIMEOUT_S):
+    """Arm the hardware watchdog in RESET mode. Returns True when armed."""
+    if watchdog is None:
+        return False
+    try:
+        watchdog.timeout = timeout
+        watchdog.mode = WatchDogMode.RESET
+        watchdog.feed()
+        return True
+    except Exception:
+        return False
+
+
+def feed_watchdog():
+    if watchdog is not None and watchdog.mode is not None:
+        watchdog.feed()
+
+
+class ErrorBudget:
+    """Error budget for one optional subsystem (LED ring, DFPlayer, CDC, ...).
+
+    Every failure is counted; after ``budget`` consecutive failures the
+    subsystem is disabled for a backoff period that doubles on each trip (up
+    to ``max_backoff_ms``). ``available()`` turns True again once the
+    backoff has passed, so the next call acts as the retry. A success resets
+    the consecutive count and the backoff.
+    """
+
+    def __init__(self, name, budget=3, backoff_ms=500, max_backoff_ms=30000):
+        self.name = name
+        self.budget = budget
+        self.base_backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.backoff_ms = backoff_ms
+        self.errors = 0
+        self.trips = 0
+        self.consecutive = 0
+        self.disabled = False
+        self.retry_at = 0
+        self.last_error = None
+
+    def available(self):
+        if not self.disabled:
+            return True
+        if ticks_diff(ticks_ms(), self.retry_at) >= 0:
+            self.disabled = False
+            return True
+        return False
+
+    def success(self):
+        self.consecutive = 0
+        self.backoff_ms = self.base_backoff_ms
+
+    def failure(self, error=None):
+        """Record a failure. Returns True when this failure disabled the subsystem."""
+        self.errors += 1
+        self.consecutive += 1
+        self.last_error = error
+        if self.consecutive < self.budget:
+            return False
+        self.consecutive = 0
+        self.trips += 1
+        self.disabled = True
+        self.retry_at = ticks_add(ticks_ms(), self.backoff_ms)
+        self.backoff_ms = min(self.backoff_ms * 2, self.max_backoff_ms)
+        return True
+
+    def reset(self):
+        """Clear the counters for SET:stats:reset; a running backoff is kept."""
+        self.errors = 0
+        self.trips = 0
+        self.last_error = None
+
+    def snapshot(self):
+        return {
+            "errors": self.errors,
+            "trips": self.trips,
+            "disabled": self.disabled,
+            "last_error": str(self.last_error) if self.last_error is not None else None,
+        }
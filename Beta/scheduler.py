@@ -0,0 +1,62 @@
+import time
+
+from ticks import ticks_ms, ticks_add, ticks_diff
+
+# (ms zonder activiteit, pauze in ms per loop). Zolang er activiteit is
+# draait de loop zonder pauze; daarna wordt de pauze stapsgewijs langer.
+IDLE_STEPS_MS = ((500, 1), (5000, 5), (30000, 10))
+WAKE_SLICE_S = 0.001  # Om de zoveel tijd wordt tijdens een pauze op nieuwe bytes gecontroleerd
+
+
+class IdleScheduler:
+    """Adaptive pause at the end of the main loop.
+
+    While there is breath activity or serial traffic the loop keeps spinning.
+    Once idle, ``idle_wait()`` sleeps in 1 ms slices (up to the step for the
+    current idle time) and returns as soon as one of the given streams has a
+    byte waiting, so the first sample after a pause is picked up within
+    about 1 ms and the longest possible added latency is the largest step.
+    """
+
+    def __init__(self, steps=IDLE_STEPS_MS, slice_s=WAKE_SLICE_S):
+        self.steps = steps
+        self.slice_s = slice_s
+        self.enabled = True
+        self.last_activity_ms = ticks_ms()
+        self.idle_waits = 0
+        self.idle_slices = 0
+
+    def reset(self):
+        """Zero the idle counters (SET:stats:reset)."""
+        self.idle_waits = 0
+        self.idle_slices = 0
+
+    def activity(self):
+        self.last_activity_ms = ticks_ms()
+
+    def interval_ms(self, now_ms):
+        """Pause length for the time since the last activity."""
+        idle_ms = ticks_diff(now_ms, self.last_activity_ms)
+        interval = 0
+        for limit, pause in self.steps:
+            if idle_ms < limit:
+                break
+            interval = pause
+        return interval
+
+    def idle_wait(self, *streams):
+        """Sleep for the current idle interval, waking early on input."""
+        if not self.enabled:
+            return
+        now = ticks_ms()
+        interval = self.interval_ms(now)
+        if not interval:
+            return
+        self.idle_waits += 1
+        deadline = ticks_add(now, interval)
+        while ticks_diff(deadline, ticks_ms()) > 0:
+            for stream in streams:
+                if stream is not None and stream.in_waiting:
+                    return
+            time.sleep(self.slice_s)
+            self.idle_slices += 1
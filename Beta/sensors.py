@@ -0,0 +1,127 @@
+from ticks import ticks_ms, ticks_add, ticks_diff
+
+SENSOR_MAX_AGE_MS = 100    # Oudere waarden van een extra kanaal tellen als 0 (sensor weg)
+ADC_INTERVAL_MS = 5        # Zo vaak wordt een ADC kanaal uitgelezen
+ADC_CALIBRATION_READS = 16
+
+
+def read_latest_line(stream, max_lines, counters):
+    """Read the buffered lines from ``stream`` and return only the newest complete one.
+
+    Older complete lines are skipped and counted in ``counters.samples_coalesced``;
+    lines without a newline are counted in ``counters.samples_dropped``.
+    Shared by the main sensor UART and extra UART channels.
+    """
+    latest = None
+    for _ in range(max_lines):
+        if not stream.in_waiting:
+            break
+        line = stream.readline()
+        if not line:
+            break
+        if line[-1] != 0x0A:
+            counters.samples_dropped += 1
+            continue
+        if latest is not None:
+            counters.samples_coalesced += 1
+        latest = line
+    return latest
+
+
+class SensorChannel:
+    """One extra breath/pressure input, normalised to -1.0 .. 1.0.
+
+    ``poll()`` is called every loop pass and keeps only the newest value with
+    its ticks_ms timestamp. The main sensor's samples set the report rate;
+    ``aligned()`` returns this channel's value for such a sample (sample and
+    hold), or 0.0 when the channel has been silent for longer than
+    ``max_age_ms``, so a disconnected tube falls back to neutral.
+    """
+
+    stream = None  # Alleen UART kanalen hebben een stream (voor vroeg ontwaken)
+
+    def __init__(self, name, max_age_ms=SENSOR_MAX_AGE_MS):
+        self.name = name
+        self.max_age_ms = max_age_ms
+        self.value = 0.0
+        self.updated_ms = ticks_ms()
+        self.samples = 0
+        self.samples_coalesced = 0
+        self.samples_dropped = 0
+        self.errors = 0
+
+    def _store(self, value, now_ms):
+        self.value = value
+        self.updated_ms = now_ms
+        self.samples += 1
+
+    def poll(self, now_ms):
+        """Read new input; returns True when a new value was stored."""
+        return False
+
+    def aligned(self, now_ms):
+        if ticks_diff(now_ms, self.updated_ms) > self.max_age_ms:
+            return 0.0
+        return self.value
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "value": self.value,
+            "samples": self.samples,
+            "coalesced": self.samples_coalesced,
+            "dropped": self.samples_dropped,
+            "errors": self.errors,
+        }
+
+
+class UartChannel(SensorChannel):
+    """Extra sensor that sends one float per line, like the main GroovTube sensor."""
+
+    def __init__(self, name, uart, max_lines=8, max_age_ms=SENSOR_MAX_AGE_MS):
+        super().__init__(name, max_age_ms)
+        self.stream = uart
+        self.max_lines = max_lines
+
+    def poll(self, now_ms):
+        line = read_latest_line(self.stream, self.max_lines, self)
+        if not line:
+            return False
+        try:
+            value = float(line.decode().strip())
+        except (ValueError, UnicodeError):
+            self.errors += 1
+            return False
+        self._store(max(-1.0, min(1.0, value)), now_ms)
+        return True
+
+
+class AdcChannel(SensorChannel):
+    """Analog pressure sensor on an ADC pin.
+
+    The rest value is measured at startup (tube open); ``span`` is the raw
+    distance from rest that maps to full scale (1.0 blowing, -1.0 sipping).
+    """
+
+    def __init__(self, name, analog_in, span=20000, interval_ms=ADC_INTERVAL_MS,
+                 max_age_ms=SENSOR_MAX_AGE_MS):
+        super().__init__(name, max_age_ms)
+        self._adc = analog_in
+        self.span = span
+        self.interval_ms = interval_ms
+        self._next_read = ticks_ms()
+        self.calibrate()
+
+    def calibrate(self, reads=ADC_CALIBRATION_READS):
+        total = 0
+        for _ in range(reads):
+            total += self._adc.value
+        self.zero = total // reads
+
+    def poll(self, now_ms):
+        if ticks_diff(now_ms, self._next_read) < 0:
+            return False
+        self._next_read = ticks_add(now_ms, self.interval_ms)
+        value = (self._adc.value - self.zero) / self.span
+        self._store(max(-1.0, min(1.0, value)), now_ms)
+        return True
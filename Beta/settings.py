@@ -2,10 +2,12 @@ import json
 import os
 import supervisor
 import storage # Importeer de storage module
+from event_log import event_log
 
 # Default settings (fallback values)
 DEFAULT_SETTINGS = {
-    "control_mode": "joystick",
+    "control_mode": "joystick",    # "joystick", "buttons" of "hybrid" (joystick + knoppen)
+    "hid_report_layout": "standard", # "standard" (XAC, 8-bit) of "extended" (16-bit + blaas/zuig assen); na herstart
 
     # Joystick instellingen
     "deadzone": 0.02,
@@ -24,6 +26,15 @@ DEFAULT_SETTINGS = {
     "inhale_gpio_threshold": -0.7,
     "blow_gpio_pin": 8,
     "inhale_gpio_pin": 9,
+    "gpio_mode_enabled": True,
+    "gpio_duration": 0,            # Minimale aan-tijd van de uitgang in ms (0 = volgt de drempel)
+    "gpio_hysteresis": 0.05,       # Zo ver moet de waarde terugvallen voordat de uitgang loslaat
+
+    # Extra sensoren (bijv. een tweede buis voor de andere as); aantal, type en pinnen na herstart.
+    # Eén dict per sensor, bijv. {"type": "adc", "pin": "A1", "axis": "y"}; ontbrekende
+    # velden komen uit EXTRA_SENSOR_DEFAULTS. ADC sensoren op A0-A2, hooguit één "uart"
+    # sensor (UART1, niet samen met de DFPlayer).
+    "extra_sensors": [],
 
     # LED Ring instellingen
     "led_enabled": True,
@@ -42,6 +53,8 @@ DEFAULT_SETTINGS = {
     "pep_max_brightness": 1.0,     # Max helderheid voor PEP (100%)
     "pep_blink_times": 3,          # Aantal keer knipperen bij succes
     "pep_blink_speed": 0.2,        # Knippersnelheid in seconden
+    "pep_reward_type": "none",     # "none", "gpio", ... (beloning na een geslaagde PEP)
+    "pep_reward_gpio_duration": 500, # Duur van de beloningspuls in ms
 
     # DFPlayer MP3 instellingen
     "dfplayer_enabled": False,
@@ -49,7 +62,49 @@ DEFAULT_SETTINGS = {
     "min_volume": 5,
     "max_volume": 30,
     "current_volume": 10,
-    "track_change_threshold": -0.5  # Inademen drempel voor volgende nummer
+    "track_change_threshold": -0.5, # Inademen drempel voor volgende nummer
+
+    # Gebaren (sip-and-puff) instellingen, tijden in ms
+    "gesture_enabled": False,
+    "gesture_puff_threshold": 0.3,
+    "gesture_sip_threshold": 0.3,
+    "gesture_hard_sip_threshold": 0.7, # Zo hard zuigen telt als "sip_hard"
+    "gesture_hysteresis": 0.05,
+    "gesture_long_ms": 600,        # Vanaf deze duur is een puff "lang"
+    "gesture_double_gap_ms": 250,  # Maximale pauze tussen twee puffs voor "puff_double"
+    "gesture_sip_puff_gap_ms": 400, # Maximale pauze tussen zuigen en blazen voor "sip_puff"
+    "gesture_gpio_ms": 200,        # Pulsduur van de "gpio:blow"/"gpio:inhale" acties
+    # Actie per gebaar: "none", "button:1".."button:8", "gpio:blow", "gpio:inhale",
+    # "dfplayer:next", "profile:0".."profile:4" of "profile:next"
+    "gesture_actions": {
+        "puff_short": "none",
+        "puff_long": "none",
+        "puff_double": "none",
+        "sip_hard": "none",
+        "sip_puff": "none"
+    },
+
+    # Diagnose instellingen
+    "watchdog_enabled": True,      # Hardware watchdog reset het apparaat als de loop vastloopt
+    "idle_sleep_enabled": True,    # Korte pauzes in de main loop als er geen activiteit is
+    "heap_instrumentation": False, # Meet geheugengebruik per stap (GET:heap)
+    "gc_idle_collect": False,      # gc.collect() alleen tijdens rust tussen ademhalingen
+    "gc_idle_interval": 1.0        # Minimale tijd in seconden tussen idle collecties
+}
+
+# Standaardwaarden voor één item in "extra_sensors"
+EXTRA_SENSOR_DEFAULTS = {
+    "type": "none",                # "none", "uart" of "adc"
+    "uart_tx": "GP20",
+    "uart_rx": "GP21",
+    "pin": "A0",                   # ADC pin voor "adc"
+    "span": 20000,                 # ADC afwijking t.o.v. rust die volle uitslag geeft
+    "axis": "y",                   # "x", "y" of "none" (alleen knoppen)
+    "invert": False,
+    "blow_button": "none",
+    "inhale_button": "none",
+    "blow_threshold": 0.5,         # Drempels voor de knoppen van deze sensor
+    "inhale_threshold": 0.5,
 }
 
 # Current settings dictionary
@@ -130,6 +185,8 @@ def save_settings():
                 print("JSON string written to file")
             print("Settings successfully written to file.")
             write_success = True # Mark success only if write completes
+            # Filesystem is writable now: persist the buffered event log as well
+            event_log.flush()
         except OSError as e:
             print(f"ERROR: Could not write to '{SETTINGS_FILENAME}': {e}")
             write_success = False
@@ -176,6 +233,31 @@ def save_settings():
     print(f"Save operation result: {write_success}")
     return write_success # Return whether the write operation itself succeeded
 
+def write_json_file(filename, data):
+    """Write ``data`` as JSON to ``filename``, remounting the filesystem writable.
+
+    Used for files next to settings.json (such as profiles.json). Returns
+    True on success.
+    """
+    text = json.dumps(data)
+    try:
+        storage.remount("/", readonly=False)
+    except Exception as e:
+        print(f"Remount to writable failed, trying anyway: {e}")
+    try:
+        with open(filename, "w") as f:
+            f.write(text)
+        event_log.flush()
+        return True
+    except Exception as e:
+        print(f"ERROR: Could not write to '{filename}': {e}")
+        return False
+    finally:
+        try:
+            storage.remount("/", readonly=True)
+        except Exception as e:
+            print(f"ERROR: Failed to remount filesystem back to read-only: {e}")
+
 # --- Initial Load Attempt ---
 load_settings()
 print("Settings module initialization complete.")
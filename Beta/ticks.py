@@ -0,0 +1,29 @@
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    import time
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & _TICKS_MAX
+
+# supervisor.ticks_ms() telt in milliseconden en loopt rond na 2**29,
+# zodat de waarden altijd kleine ints blijven (geen heap allocatie).
+_TICKS_PERIOD = 1 << 29
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+
+def ticks_add(ticks, delta):
+    """Add ``delta`` milliseconds to a tick value, wrapping like ticks_ms()."""
+    return (ticks + delta) % _TICKS_PERIOD
+
+
+def ticks_diff(ticks1, ticks2):
+    """Signed difference ``ticks1 - ticks2`` in milliseconds, wrap-around safe."""
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+    return ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+
+
+def ticks_less(ticks1, ticks2):
+    """True when ``ticks1`` is before ``ticks2``."""
+    return ticks_diff(ticks1, ticks2) < 0
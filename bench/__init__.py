@@ -0,0 +1 @@
+"""CPython micro-benchmarks for the firmware hot paths (see __main__.py)."""
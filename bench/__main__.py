@@ -0,0 +1,146 @@
+"""Run the micro-benchmarks: python -m bench [case ...] [--save] [--output FILE]"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from .cases import CASES
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+TOLERANCE = 0.25        # Meer dan 25% trager dan de baseline telt als regressie
+ALLOC_TOLERANCE_B = 8   # Bytes per op die er bij mogen komen
+ALLOC_SAMPLES = 500     # Zoveel ops worden met tracemalloc gemeten
+
+
+def _noop(x):
+    return None
+
+
+def _time_loop(op, inputs, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for x in inputs:
+            op(x)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(inputs)
+
+
+def measure_ns(op, inputs, repeat):
+    """Best-of-``repeat`` ns per op, minus the cost of the call loop itself."""
+    _time_loop(op, inputs, 1)  # Opwarmen
+    return max(0.0, _time_loop(op, inputs, repeat) - _time_loop(_noop, inputs, repeat))
+
+
+def _alloc_loop(op, inputs):
+    total = 0
+    for x in inputs:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        op(x)
+        total += tracemalloc.get_traced_memory()[1] - before
+    return total / len(inputs)
+
+
+def measure_alloc(op, inputs):
+    """Average bytes allocated per op (tracemalloc peak above the starting level).
+
+    Temporary objects (floats, strings, tuples) show up here even though
+    they are freed right away, which is what matters for the MCU heap.
+    """
+    inputs = inputs[:ALLOC_SAMPLES]
+    tracemalloc.start()
+    try:
+        _alloc_loop(op, inputs)  # Opwarmen (caches, interned strings)
+        return max(0.0, _alloc_loop(op, inputs) - _alloc_loop(_noop, inputs))
+    finally:
+        tracemalloc.stop()
+
+
+def environment():
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "implementation": platform.python_implementation()}
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def compare(name, result, baselines, tolerance):
+    """Flags for one case against the stored baseline."""
+    base = (baselines or {}).get("cases", {}).get(name)
+    if not base:
+        return "", "new"
+    change = result["ns_per_op"] / base["ns_per_op"] - 1.0 if base["ns_per_op"] else 0.0
+    flags = []
+    if change > tolerance:
+        flags.append("SLOWER")
+    if result["alloc_bytes_per_op"] > base["alloc_bytes_per_op"] + ALLOC_TOLERANCE_B:
+        flags.append("MORE-ALLOC")
+    return f"{change:+.0%}", " ".join(flags) or "ok"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench", description=__doc__)
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all): {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+    names = args.cases or list(CASES)
+
+    baselines = load_baselines(args.baseline)
+    lines = []
+    if baselines and baselines.get("environment") != environment():
+        lines.append(f"note: baseline was recorded on {baselines.get('environment')}, "
+                     f"this is {environment()}")
+    lines.append(f"{'case':<26}{'ns/op':>10}{'alloc B/op':>12}{'vs base':>10}  status")
+
+    results = {}
+    regressions = 0
+    for name in names:
+        op, inputs = CASES[name]()
+        result = {"ns_per_op": round(measure_ns(op, inputs, args.repeat), 1),
+                  "alloc_bytes_per_op": round(measure_alloc(op, inputs), 1)}
+        results[name] = result
+        change, status = compare(name, result, baselines, args.tolerance)
+        if status not in ("ok", "new"):
+            regressions += 1
+        lines.append(f"{name:<26}{result['ns_per_op']:>10.1f}{result['alloc_bytes_per_op']:>12.1f}"
+                     f"{change:>10}  {status}")
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+    if args.save:
+        stored = baselines if baselines and baselines.get("environment") == environment() else {}
+        stored["environment"] = environment()
+        stored.setdefault("cases", {}).update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Benchmark cases: each returns (op, inputs); op is called once per input."""
+
+from . import traces
+from .firmware import FakeHidDevice, import_gamepad_module, install_fake_modules, load_code_functions
+
+
+def _gamepad(layout="standard"):
+    return import_gamepad_module().Gamepad([FakeHidDevice()], layout=layout)
+
+
+def _axis_values(gamepad, values):
+    center = gamepad.axis_center
+    return [max(0, min(gamepad.axis_max, int(center + v * center))) for v in values]
+
+
+def gamepad_send_changed():
+    """set_state() where every sample changes the report (send path)."""
+    gamepad = _gamepad()
+    xs = _axis_values(gamepad, traces.breathing())
+    xs = [x if x != xs[i - 1] else x ^ 1 for i, x in enumerate(xs)]
+    return (lambda x: gamepad.set_state(x=x)), xs
+
+
+def gamepad_send_dedupe():
+    """set_state() with an unchanged report (suppressed by the dedupe)."""
+    gamepad = _gamepad()
+    gamepad.set_state(x=200, buttons=1)
+    return (lambda x: gamepad.set_state(x=x, buttons=1)), [200] * 1000
+
+
+def gamepad_send_extended():
+    """set_state() on the 16-bit extended layout with Z/Rz."""
+    gamepad = _gamepad("extended")
+    xs = _axis_values(gamepad, traces.breathing())
+    return (lambda x: gamepad.set_state(x=x, z=x, rz=0)), xs
+
+
+def gamepad_press_buttons():
+    """Alternating press_buttons()/release_buttons()."""
+    gamepad = _gamepad()
+
+    def op(button):
+        gamepad.press_buttons(button)
+        gamepad.release_buttons(button)
+
+    return op, [1 + i % 8 for i in range(1000)]
+
+
+def gamepad_move_joysticks():
+    """move_joysticks() following a breathing trace."""
+    gamepad = _gamepad()
+    return (lambda x: gamepad.move_joysticks(x=x, y=255 - x)), _axis_values(gamepad, traces.breathing())
+
+
+def map_range():
+    ns = load_code_functions(["map_range"])
+    fn = ns["map_range"]
+    return (lambda v: fn(v, -1.0, 1.0, 0, 255)), traces.breathing()
+
+
+def handle_pep_mode():
+    ns = load_code_functions(["handle_pep_mode"])
+    s = ns["settings"].settings
+    s["pep_mode_enabled"] = True
+    s["pep_hold_time"] = 1e9  # Geen knipperreeks (met sleep) tijdens de meting
+    return ns["handle_pep_mode"], traces.pep_session()
+
+
+def update_measurements():
+    ns = load_code_functions(["update_measurements"])
+    return ns["update_measurements"], traces.breathing()
+
+
+def uart_parse():
+    """read_latest_line() on a one-line buffer plus the float parse of the main loop."""
+    install_fake_modules()
+    from sensors import read_latest_line
+
+    class Stream:
+        line = b""
+
+        @property
+        def in_waiting(self):
+            return len(self.line)
+
+        def readline(self):
+            line, self.line = self.line, b""
+            return line
+
+    class Counters:
+        samples_coalesced = 0
+        samples_dropped = 0
+
+    stream, counters = Stream(), Counters()
+
+    def op(line):
+        stream.line = line
+        return float(read_latest_line(stream, 8, counters).decode().strip())
+
+    return op, traces.uart_lines(traces.breathing())
+
+
+CASES = {
+    "gamepad_send_changed": gamepad_send_changed,
+    "gamepad_send_dedupe": gamepad_send_dedupe,
+    "gamepad_send_extended": gamepad_send_extended,
+    "gamepad_press_buttons": gamepad_press_buttons,
+    "gamepad_move_joysticks": gamepad_move_joysticks,
+    "map_range": map_range,
+    "handle_pep_mode": handle_pep_mode,
+    "update_measurements": update_measurements,
+    "uart_parse": uart_parse,
+}
@@ -0,0 +1,131 @@
+"""Load the firmware modules and code.py functions under CPython.
+
+code.py talks to hardware at import time, so the functions under test are
+pulled out of its source with ``ast`` and executed in a namespace with fake
+globals. Everything else (hid_xac_gamepad, sensors, ...) is imported
+normally with fake ``usb_hid``/``adafruit_hid`` modules installed.
+"""
+
+import ast
+import math
+import os
+import sys
+import time
+import types
+
+BETA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Beta")
+
+
+class FakeHidDevice:
+    """Stands in for a usb_hid.Device; only counts reports."""
+
+    usage_page = 0x01
+    usage = 0x05
+
+    def __init__(self):
+        self.reports = 0
+
+    def send_report(self, report):
+        self.reports += 1
+
+
+class FakePixels:
+    """Stands in for neopixel.NeoPixel."""
+
+    def __init__(self):
+        self.brightness = 1.0
+        self.color = (0, 0, 0)
+
+    def fill(self, color):
+        self.color = color
+
+    def show(self):
+        pass
+
+
+class FakeOutput:
+    def pulse(self, duration_ms, now_ms):
+        pass
+
+
+def install_fake_modules():
+    if "usb_hid" not in sys.modules:
+        usb_hid = types.ModuleType("usb_hid")
+        usb_hid.devices = [FakeHidDevice()]
+        sys.modules["usb_hid"] = usb_hid
+    if "adafruit_hid" not in sys.modules:
+        adafruit_hid = types.ModuleType("adafruit_hid")
+        adafruit_hid.find_device = lambda devices, usage_page, usage: devices[0]
+        sys.modules["adafruit_hid"] = adafruit_hid
+    if BETA_DIR not in sys.path:
+        sys.path.insert(0, BETA_DIR)
+
+
+def import_gamepad_module():
+    """Import hid_xac_gamepad; its CircuitPython version check is satisfied for the import."""
+    install_fake_modules()
+    if "hid_xac_gamepad" in sys.modules:
+        return sys.modules["hid_xac_gamepad"]
+    real = sys.implementation
+    fake = types.SimpleNamespace(**vars(real))
+    fake.version = (9, 0, 0)
+    sys.implementation = fake
+    try:
+        import hid_xac_gamepad
+    finally:
+        sys.implementation = real
+    return hid_xac_gamepad
+
+
+def _read_source(name):
+    with open(os.path.join(BETA_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def default_settings():
+    """DEFAULT_SETTINGS from settings.py (importing it would touch /settings.json)."""
+    for node in ast.parse(_read_source("settings.py")).body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "DEFAULT_SETTINGS":
+            return ast.literal_eval(node.value)
+    raise LookupError("DEFAULT_SETTINGS not found in settings.py")
+
+
+def load_code_functions(names, overrides=None):
+    """Return a namespace with the named code.py functions and fake globals."""
+    install_fake_modules()
+    from ticks import ticks_ms
+
+    namespace = {
+        "__name__": "code_bench",
+        "math": math,
+        "time": time,
+        "settings": types.SimpleNamespace(settings=default_settings()),
+        "debug_print": lambda message: None,
+        "log_event": lambda message, error=False: None,
+        "show_ring": lambda: None,
+        "feed_watchdog": lambda: None,
+        "ticks_ms": ticks_ms,
+        "led_ring": FakePixels(),
+        "blow_output": FakeOutput(),
+        "pep_success_start_time": None,
+        "pep_target_reached": False,
+        "measurement_data": {
+            "max_exhale": -float("inf"),
+            "min_inhale": float("inf"),
+            "current_exhale_start": None,
+            "current_inhale_start": None,
+            "longest_exhale": 0,
+            "longest_inhale": 0,
+        },
+    }
+    if overrides:
+        namespace.update(overrides)
+    wanted = set(names)
+    nodes = [node for node in ast.parse(_read_source("code.py")).body
+             if isinstance(node, ast.FunctionDef) and node.name in wanted]
+    missing = wanted - {node.name for node in nodes}
+    if missing:
+        raise LookupError(f"code.py has no function(s): {', '.join(sorted(missing))}")
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), os.path.join(BETA_DIR, "code.py"), "exec"),
+         namespace)
+    return namespace
@@ -0,0 +1,43 @@
+"""Deterministic breath traces that look like real sensor output."""
+
+import math
+import random
+
+SAMPLE_RATE_HZ = 50
+
+
+def breathing(seconds=20.0, seed=1):
+    """Calm breathing: ~4 s cycles, stronger blows than sips, sensor noise and rests."""
+    rng = random.Random(seed)
+    values = []
+    t = 0.0
+    dt = 1.0 / SAMPLE_RATE_HZ
+    while t < seconds:
+        phase = math.sin(2 * math.pi * t / 4.0)
+        amplitude = 0.8 if phase > 0 else 0.5
+        value = amplitude * phase + rng.gauss(0.0, 0.01)
+        # Pauze rond het omslagpunt, zoals bij echte ademhaling
+        if abs(phase) < 0.15:
+            value = rng.gauss(0.0, 0.005)
+        values.append(round(value, 4))
+        t += dt
+    return values
+
+
+def pep_session(seconds=20.0, seed=2):
+    """Long exhalations around the PEP target with small sips in between."""
+    rng = random.Random(seed)
+    values = []
+    for i in range(int(seconds * SAMPLE_RATE_HZ)):
+        t = i / SAMPLE_RATE_HZ
+        if t % 5.0 < 3.5:
+            value = 0.75 + 0.1 * math.sin(2 * math.pi * t) + rng.gauss(0.0, 0.02)
+        else:
+            value = -0.3 + rng.gauss(0.0, 0.02)
+        values.append(round(value, 4))
+    return values
+
+
+def uart_lines(values):
+    """The sensor's wire format: one float per line."""
+    return [f"{value}\r\n".encode() for value in values]
@@ -0,0 +1,16 @@
+"""Host-side tooling for GroovTube XAC devices (USB data channel protocol)."""
+
+from .device import Device, DeviceError
+from .emulator import DeviceEmulator
+from .recorder import BreathRecorder, read_breath_file
+from .transport import SerialLink, open_port
+
+__all__ = [
+    "BreathRecorder",
+    "Device",
+    "DeviceEmulator",
+    "DeviceError",
+    "SerialLink",
+    "open_port",
+    "read_breath_file",
+]
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from . import fleet
+from .emulator import DeviceEmulator
+
+
+def _ports(args):
+    if args.ports == ["auto"]:
+        return fleet.find_ports()
+    return args.ports
+
+
+def _report(results):
+    failed = 0
+    for name, result in results.items():
+        if isinstance(result, Exception) or (isinstance(result, (list, dict)) and result):
+            failed += 1
+        print(f"{name}: {result}")
+    return 1 if failed else 0
+
+
+async def _run(args):
+    ports = _ports(args)
+    if not ports:
+        print("No devices found")
+        return 1
+    devices, failures = await fleet.open_devices(ports)
+    for path, error in failures.items():
+        print(f"{path}: cannot open: {error}")
+    try:
+        if args.command == "configure" or args.command == "verify":
+            with open(args.settings) as f:
+                values = json.load(f)
+            if args.command == "configure":
+                status = _report(await fleet.configure(devices, values, save=not args.no_save))
+                status |= _report(await fleet.verify(devices, values))
+            else:
+                status = _report(await fleet.verify(devices, values))
+        elif args.command == "backup":
+            status = _report({name: result for name, result in
+                              (await fleet.backup(devices, args.out)).items()
+                              if isinstance(result, Exception)})
+            print(f"Backups written to {args.out}")
+        else:
+            for name, (path, samples) in (await fleet.record(devices, args.out, args.seconds)).items():
+                print(f"{name}: {samples} samples -> {path}")
+            status = 0
+    finally:
+        fleet.close_devices(devices)
+    return status or (1 if failures else 0)
+
+
+def _emulate(args):
+    emulators = [DeviceEmulator(rate_hz=args.rate) for _ in range(args.count)]
+    for emulator in emulators:
+        print(emulator.start())
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    for emulator in emulators:
+        emulator.stop()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="xac_host", description="Bulk tooling for GroovTube XAC devices")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("ports", help="list detected device data ports")
+    for name, help_text in (("configure", "push settings (and SAVE) to devices, then verify"),
+                            ("verify", "check device settings against a JSON file")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("settings", help="JSON file with the settings to apply/check")
+        p.add_argument("ports", nargs="+", help="serial ports, or 'auto'")
+        if name == "configure":
+            p.add_argument("--no-save", action="store_true", help="do not SAVE on the device")
+    p = sub.add_parser("backup", help="EXPORT the settings of devices to JSON files")
+    p.add_argument("ports", nargs="+")
+    p.add_argument("--out", default="backups")
+    p = sub.add_parser("record", help="record BREATH_DATA into columnar .breath files")
+    p.add_argument("ports", nargs="+")
+    p.add_argument("--out", default="recordings")
+    p.add_argument("--seconds", type=float, default=60.0)
+    p = sub.add_parser("emulate", help="start fake devices on pseudo terminals")
+    p.add_argument("--count", type=int, default=1)
+    p.add_argument("--rate", type=float, default=50.0, help="BREATH_DATA lines per second")
+
+    args = parser.parse_args(argv)
+    if args.command == "ports":
+        for port in fleet.find_ports():
+            print(port)
+        return 0
+    if args.command == "emulate":
+        return _emulate(args)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
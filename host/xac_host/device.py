@@ -0,0 +1,108 @@
+import asyncio
+import collections
+import itertools
+import json
+import time
+
+from .transport import SerialLink, open_port
+
+REQUEST_TIMEOUT_S = 3.0
+
+
+class DeviceError(Exception):
+    """The device answered a command with ERROR:..."""
+
+
+class Device:
+    """One GroovTube XAC device on its USB data channel.
+
+    Commands are sent with a request id ("#<id> GET:settings") so several can
+    be in flight at once; the firmware executes them in order and echoes the
+    id on every response. Untagged lines are BREATH_DATA samples (passed to
+    the breath listeners) or debug output (kept in ``log``).
+    """
+
+    def __init__(self, port, name=None):
+        self.link = SerialLink(port, self._on_line)
+        self.name = name or self.link.name
+        self._ids = itertools.count(1)
+        self._waiters = {}
+        self.breath_listeners = []
+        self.log = collections.deque(maxlen=200)
+        self.samples = 0
+
+    @classmethod
+    async def open(cls, path, name=None):
+        device = cls(open_port(path), name or path)
+        device.link.start()
+        return device
+
+    def close(self):
+        self.link.close()
+        for future in self._waiters.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"{self.name} closed"))
+        self._waiters.clear()
+
+    def _on_line(self, line):
+        if line.startswith("#"):
+            request_id, _, response = line.partition(" ")
+            future = self._waiters.pop(request_id, None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        elif line.startswith("BREATH_DATA:"):
+            try:
+                value = float(line[len("BREATH_DATA:"):])
+            except ValueError:
+                return
+            self.samples += 1
+            now = time.time()
+            for listener in self.breath_listeners:
+                listener(self, now, value)
+        elif line:
+            self.log.append(line)
+
+    async def request(self, command, timeout=REQUEST_TIMEOUT_S):
+        """Send one command and return its response line (without the id)."""
+        request_id = f"#{next(self._ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[request_id] = future
+        try:
+            await self.link.write_line(f"{request_id} {command}")
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiters.pop(request_id, None)
+        if response.startswith("ERROR"):
+            raise DeviceError(f"{self.name}: {response}")
+        return response
+
+    async def _request_json(self, command, prefix):
+        response = await self.request(command)
+        if not response.startswith(prefix):
+            raise DeviceError(f"{self.name}: unexpected response {response[:60]!r}")
+        return json.loads(response[len(prefix):])
+
+    async def get_settings(self):
+        return await self._request_json("GET:settings", "SETTINGS::")
+
+    async def get_stats(self):
+        return await self._request_json("GET:stats", "STATS::")
+
+    async def export_settings(self):
+        return await self._request_json("EXPORT", "EXPORT::")
+
+    async def set_settings(self, values):
+        await self.request("SET:settings::" + json.dumps(values))
+
+    async def import_settings(self, values):
+        await self.request("IMPORT::" + json.dumps(values))
+
+    async def save(self):
+        await self.request("SAVE")
+
+    async def batch(self, commands, timeout=REQUEST_TIMEOUT_S):
+        """Run several commands in one round trip; returns their response lists."""
+        response = await self.request("BATCH::" + json.dumps(commands), timeout)
+        if not response.startswith("BATCH::"):
+            raise DeviceError(f"{self.name}: unexpected response {response[:60]!r}")
+        return json.loads(response[len("BATCH::"):])
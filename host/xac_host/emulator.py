@@ -0,0 +1,128 @@
+import ast
+import json
+import math
+import os
+import threading
+import time
+
+SETTINGS_SOURCE = os.path.join(os.path.dirname(__file__), "..", "..", "Beta", "settings.py")
+FALLBACK_SETTINGS = {"control_mode": "joystick", "deadzone": 0.02, "sensitivity": 2.0}
+
+
+def default_settings():
+    """DEFAULT_SETTINGS from the firmware's settings.py, read without importing it."""
+    try:
+        with open(SETTINGS_SOURCE) as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "DEFAULT_SETTINGS":
+                return ast.literal_eval(node.value)
+    except (OSError, ValueError, SyntaxError):
+        pass
+    return dict(FALLBACK_SETTINGS)
+
+
+class DeviceEmulator:
+    """Fake device on a pseudo terminal, for testing host tools without hardware.
+
+    Speaks the firmware's data channel protocol (request ids, GET/SET/SAVE/
+    EXPORT/IMPORT/BATCH) and streams a synthetic breath signal as
+    BREATH_DATA lines. ``start()`` returns the pty path to open.
+    """
+
+    def __init__(self, rate_hz=50, breath_period_s=4.0):
+        self.settings = default_settings()
+        self.saved = dict(self.settings)
+        self.rate_hz = rate_hz
+        self.breath_period_s = breath_period_s
+        self.streaming = True
+        self.commands = 0
+        self._master = None
+        self._slave = None
+        self._running = False
+        self._rx = bytearray()
+        self._write_lock = threading.Lock()
+        self.path = None
+
+    def start(self):
+        import pty
+        import tty
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.path = os.ttyname(self._slave)
+        self._running = True
+        threading.Thread(target=self._command_thread, daemon=True).start()
+        threading.Thread(target=self._breath_thread, daemon=True).start()
+        return self.path
+
+    def stop(self):
+        self._running = False
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _write(self, line):
+        with self._write_lock:
+            try:
+                os.write(self._master, (line + "\n").encode())
+            except OSError:
+                self._running = False
+
+    def _breath_thread(self):
+        start = time.monotonic()
+        while self._running:
+            if self.streaming:
+                t = time.monotonic() - start
+                value = round(0.8 * math.sin(2 * math.pi * t / self.breath_period_s), 4)
+                self._write(f"BREATH_DATA:{value}")
+            time.sleep(1.0 / self.rate_hz)
+
+    def _command_thread(self):
+        while self._running:
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                break
+            if not data:
+                break
+            self._rx.extend(data)
+            while b"\n" in self._rx:
+                line, _, rest = bytes(self._rx).partition(b"\n")
+                self._rx = bytearray(rest)
+                line = line.decode("utf-8", "replace").strip()
+                if line:
+                    self._handle_line(line)
+
+    def _handle_line(self, line):
+        prefix = ""
+        if line.startswith("#"):
+            request_id, _, line = line.partition(" ")
+            prefix = request_id + " "
+        self.commands += 1
+        for response in self.execute(line):
+            self._write(prefix + response)
+
+    def execute(self, command):
+        """Responses (without request id) for one command."""
+        try:
+            if command.startswith("BATCH::"):
+                results = [["ERROR:Invalid batch command"] if c.startswith("BATCH::") else self.execute(c)
+                           for c in json.loads(command[len("BATCH::"):])]
+                return ["BATCH::" + json.dumps(results)]
+            if command.startswith("SET:settings::") or command.startswith("IMPORT::"):
+                self.settings.update(json.loads(command.split("::", 1)[1]))
+                return ["OK"]
+            if command == "GET:settings":
+                return ["SETTINGS::" + json.dumps(self.settings)]
+            if command == "EXPORT":
+                return ["EXPORT::" + json.dumps(self.settings)]
+            if command == "SAVE":
+                self.saved = dict(self.settings)
+                return ["OK"]
+            if command == "GET:stats":
+                return ["STATS::" + json.dumps({"commands": self.commands})]
+        except Exception as e:
+            return [f"ERROR:Command error: {e}"]
+        return [f"ERROR:Unknown command: {command}"]
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+import re
+import time
+
+from .device import Device
+from .recorder import BreathRecorder
+
+CIRCUITPYTHON_VID = 0x239A
+MAX_CONCURRENT = 32  # Zoveel apparaten tegelijk openen/configureren
+
+
+def find_ports():
+    """USB data channels of connected CircuitPython devices (needs pyserial)."""
+    try:
+        from serial.tools import list_ports
+    except ImportError:
+        return []
+    ports = []
+    for info in list_ports.comports():
+        if info.vid != CIRCUITPYTHON_VID:
+            continue
+        # CircuitPython heeft een console en een data kanaal; alleen het data kanaal spreekt het protocol
+        interface = (info.interface or "").lower()
+        if "data" in interface or not interface:
+            ports.append(info.device)
+    return sorted(ports)
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "device"
+
+
+async def _each(devices, action):
+    """Run ``action(device)`` on all devices concurrently; exceptions become results."""
+    limit = asyncio.Semaphore(MAX_CONCURRENT)
+
+    async def run(device):
+        async with limit:
+            try:
+                return await action(device)
+            except Exception as e:
+                return e
+
+    results = await asyncio.gather(*(run(device) for device in devices))
+    return dict(zip((device.name for device in devices), results))
+
+
+async def open_devices(paths):
+    """Open every port; ports that fail to open are reported, not raised."""
+    devices, failures = [], {}
+    for path in paths:
+        try:
+            devices.append(await Device.open(path))
+        except Exception as e:
+            failures[path] = e
+    return devices, failures
+
+
+def close_devices(devices):
+    for device in devices:
+        device.close()
+
+
+async def configure(devices, values, save=True):
+    """Push ``values`` (and SAVE) to every device in a single round trip each."""
+    commands = ["SET:settings::" + json.dumps(values)]
+    if save:
+        commands.append("SAVE")
+
+    async def apply(device):
+        results = await device.batch(commands, timeout=10.0)
+        errors = [line for responses in results for line in responses if line.startswith("ERROR")]
+        return errors or "OK"
+
+    return await _each(devices, apply)
+
+
+async def verify(devices, values):
+    """Compare the device settings with ``values``; returns the differing keys per device."""
+    async def check(device):
+        current = await device.get_settings()
+        return {key: current.get(key) for key, value in values.items() if current.get(key) != value}
+
+    return await _each(devices, check)
+
+
+async def backup(devices, directory):
+    """EXPORT every device into ``<directory>/<port>.json``."""
+    os.makedirs(directory, exist_ok=True)
+
+    async def save(device):
+        exported = await device.export_settings()
+        path = os.path.join(directory, _safe_name(device.name) + ".json")
+        with open(path, "w") as f:
+            json.dump(exported, f, indent=2, sort_keys=True)
+        return path
+
+    return await _each(devices, save)
+
+
+async def record(devices, directory, seconds):
+    """Stream BREATH_DATA of every device into columnar files for ``seconds``."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    recorders = {}
+    for device in devices:
+        path = os.path.join(directory, f"{_safe_name(device.name)}-{stamp}.breath")
+        recorders[device.name] = BreathRecorder(path)
+        device.breath_listeners.append(
+            lambda dev, timestamp, value: recorders[dev.name].add(timestamp, value))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        for device in devices:
+            device.breath_listeners.clear()
+        for recorder in recorders.values():
+            recorder.close()
+    return {name: (recorder.path, recorder.samples) for name, recorder in recorders.items()}
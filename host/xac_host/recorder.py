@@ -0,0 +1,87 @@
+import array
+import struct
+import sys
+
+# Kolomgewijs ademdata bestand:
+#   header  b"XACBRTH1"
+#   blokken struct "<Id" (aantal samples, starttijd in unix seconden)
+#           daarna alle tijd offsets (uint16, ms vanaf de starttijd)
+#           en daarna alle waarden (float32)
+# Zo kost een sample 6 bytes en is elke kolom los in te lezen.
+MAGIC = b"XACBRTH1"
+BLOCK_HEADER = struct.Struct("<Id")
+BLOCK_SAMPLES = 1024
+MAX_OFFSET_MS = 0xFFFF
+
+
+def _little_endian(column):
+    if sys.byteorder != "little":
+        column = array.array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+class BreathRecorder:
+    """Buffers breath samples and writes them as columnar blocks."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._start = None
+        self._offsets = array.array("H")
+        self._values = array.array("f")
+        self.samples = 0
+
+    def add(self, timestamp, value):
+        if self._start is None:
+            self._start = timestamp
+        offset = int(round((timestamp - self._start) * 1000))
+        if offset > MAX_OFFSET_MS or offset < 0:
+            self.flush()
+            self._start = timestamp
+            offset = 0
+        self._offsets.append(offset)
+        self._values.append(value)
+        self.samples += 1
+        if len(self._values) >= BLOCK_SAMPLES:
+            self.flush()
+
+    def flush(self):
+        count = len(self._values)
+        if count:
+            self._file.write(BLOCK_HEADER.pack(count, self._start))
+            self._file.write(_little_endian(self._offsets).tobytes())
+            self._file.write(_little_endian(self._values).tobytes())
+            self._offsets = array.array("H")
+            self._values = array.array("f")
+        self._start = None
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def read_breath_file(path):
+    """Return (timestamps, values) from a file written by BreathRecorder."""
+    timestamps = []
+    values = array.array("f")
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a breath data file")
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                break
+            count, start = BLOCK_HEADER.unpack(header)
+            offsets = array.array("H")
+            offsets.frombytes(f.read(count * 2))
+            block = array.array("f")
+            block.frombytes(f.read(count * 4))
+            if sys.byteorder != "little":
+                offsets.byteswap()
+                block.byteswap()
+            timestamps.extend(start + offset / 1000.0 for offset in offsets)
+            values.extend(block)
+    return timestamps, values
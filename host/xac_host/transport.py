@@ -0,0 +1,184 @@
+import asyncio
+import os
+import threading
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+BAUDRATE = 115200  # Wordt door USB CDC genegeerd, maar pyserial wil een waarde
+MAX_LINE = 64 * 1024
+THREAD_READ_TIMEOUT_S = 0.05  # Blokkerende read() in de leesthread (Windows, loop://)
+WRITE_RETRY_S = 0.005         # Wachttijd na een volle zendbuffer als er geen fd is om op te wachten
+
+# write_timeout=0: write() blokkeert nooit en schrijft wat past; de rest wacht op de event loop
+if serial is not None:
+    _WRITE_FULL = (BlockingIOError, serial.SerialTimeoutException)
+else:
+    _WRITE_FULL = (BlockingIOError,)
+
+
+class _FdPort:
+    """Minimal pyserial-like wrapper around a tty/pty file descriptor.
+
+    Used when pyserial is not installed (POSIX only).
+    """
+
+    def __init__(self, path):
+        import termios
+        import tty
+        self.port = path
+        self._fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self._fd, termios.TCSANOW)
+
+    def fileno(self):
+        return self._fd
+
+    def read(self, size=4096):
+        try:
+            return os.read(self._fd, size)
+        except BlockingIOError:
+            return b""
+
+    def write(self, data):
+        return os.write(self._fd, data)
+
+    def close(self):
+        os.close(self._fd)
+
+
+def open_port(path, baudrate=BAUDRATE):
+    """Open a serial port with pyserial when available, else as a raw tty."""
+    if serial is not None:
+        return serial.serial_for_url(path, baudrate=baudrate, timeout=0, write_timeout=0)
+    if os.name != "posix":
+        raise RuntimeError("pyserial is required on this platform")
+    return _FdPort(path)
+
+
+class SerialLink:
+    """Async line transport over any pyserial-compatible port object.
+
+    Ports with a usable ``fileno()`` (POSIX ttys and ptys) are read from the
+    event loop with ``add_reader``; anything else (Windows, ``loop://`` URLs)
+    gets a small reader thread. Complete lines are delivered to ``on_line``
+    without the trailing newline.
+    """
+
+    def __init__(self, port, on_line):
+        self.port = port
+        self.name = getattr(port, "port", None) or getattr(port, "name", "?")
+        self._on_line = on_line
+        self._buffer = bytearray()
+        self._loop = None
+        self._fd = None
+        self._thread = None
+        self._write_waiter = None
+        self._closed = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        fd = None
+        if os.name == "posix":
+            try:
+                fd = self.port.fileno()
+            except Exception:
+                fd = None
+        if fd is not None:
+            self._fd = fd
+            self._loop.add_reader(fd, self._on_readable)
+        else:
+            # De leesthread blokkeert kort per read() in plaats van te spinnen;
+            # timeout=0 blijft alleen voor het add_reader pad
+            if hasattr(self.port, "timeout"):
+                self.port.timeout = THREAD_READ_TIMEOUT_S
+            self._thread = threading.Thread(target=self._read_thread, daemon=True)
+            self._thread.start()
+
+    def _on_readable(self):
+        try:
+            data = self.port.read(4096)
+        except Exception:
+            self.close()
+            return
+        if data:
+            self._feed(data)
+
+    def _read_thread(self):
+        while not self._closed:
+            try:
+                data = self.port.read(max(1, getattr(self.port, "in_waiting", 0)))
+            except Exception:
+                break
+            if data:
+                self._loop.call_soon_threadsafe(self._feed, data)
+        self._loop.call_soon_threadsafe(self.close)
+
+    def _feed(self, data):
+        self.bytes_in += len(data)
+        self._buffer.extend(data)
+        while True:
+            end = self._buffer.find(b"\n")
+            if end < 0:
+                break
+            line = bytes(self._buffer[:end]).rstrip(b"\r")
+            del self._buffer[:end + 1]
+            self._on_line(line.decode("utf-8", "replace"))
+        if len(self._buffer) > MAX_LINE:
+            self._buffer.clear()
+
+    async def write_line(self, line):
+        """Write one line without blocking the event loop (partial writes are resumed)."""
+        data = (line + "\n").encode()
+        view = memoryview(data)
+        while view:
+            if self._closed:
+                raise ConnectionError(f"{self.name} is closed")
+            try:
+                count = self.port.write(view) or 0
+            except _WRITE_FULL:
+                count = 0
+            self.bytes_out += count
+            view = view[count:]
+            if view:
+                await self._wait_writable()
+
+    async def _wait_writable(self):
+        """Wait until the port can take more data (the device reads again)."""
+        if self._fd is None:
+            await asyncio.sleep(WRITE_RETRY_S)
+            return
+        ready = self._write_waiter = self._loop.create_future()
+
+        def on_writable():
+            if not ready.done():
+                ready.set_result(None)
+
+        self._loop.add_writer(self._fd, on_writable)
+        try:
+            await ready
+        finally:
+            self._write_waiter = None
+            if not self._closed:
+                self._loop.remove_writer(self._fd)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._fd is not None and self._loop is not None:
+            self._loop.remove_reader(self._fd)
+            self._loop.remove_writer(self._fd)
+        if self._write_waiter is not None and not self._write_waiter.done():
+            self._write_waiter.set_result(None)  # write_line() ziet daarna dat de link dicht is
+        try:
+            self.port.close()
+        except Exception:
+            pass
+
+    @property
+    def closed(self):
+        return self._closed
@@ -102,30 +102,46 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // --- Web Serial & Device Logic (aanvulling voor statusblok) ---
     let breathTimeoutInterval = null;
+    let breathRenderPending = false;
+
+    // Elke sample werkt alleen de status bij; de DOM wordt één keer per frame
+    // bijgewerkt met de laatste waarde (zie renderBreath)
+    function handleBreathSample(val, timestamp) {
+        window.lastBreathValue = val;
+        lastBreathTimestamp = timestamp;
+        if (!breathRenderPending) {
+            breathRenderPending = true;
+            requestAnimationFrame(renderBreath);
+        }
+    }
+
+    function renderBreath() {
+        breathRenderPending = false;
+        const val = window.lastBreathValue;
+        updateHeaderBreath(val);
+        updateGpioTestbars(val);
+        updateJoystickTestbar(val); // FIX: testbalk beweegt nu mee
+        // Update ook knoppen testbalken als we in knoppen modus zijn
+        const controlMode = document.getElementById('controlMode')?.value;
+        if (controlMode === 'buttons' || controlMode === 'hybrid') {
+            updateButtonTestbars(val);
+        }
+        // Statusblok: als eerste data, status = groovtube
+        if (statusMode !== 'groovtube') setHeaderStatus('groovtube');
+        if (!breathTimeoutInterval) {
+            breathTimeoutInterval = setInterval(()=>{
+                if (isConnected) {
+                    if (Date.now() - lastBreathTimestamp > 2000 && statusMode === 'groovtube') {
+                        setHeaderStatus('adapter');
+                    }
+                }
+            }, 500);
+        }
+    }
+
     function handleDeviceLine(line) {
         if (line.startsWith('BREATH_DATA:')) {
-            const val = parseFloat(line.split(':')[1]);
-            window.lastBreathValue = val;
-            updateHeaderBreath(val);
-            updateGpioTestbars(val);
-            updateJoystickTestbar(val); // FIX: testbalk beweegt nu mee
-            // Update ook knoppen testbalken als we in knoppen modus zijn
-            const controlMode = document.getElementById('controlMode')?.value;
-            if (controlMode === 'buttons') {
-                updateButtonTestbars(val);
-            }
-            // Statusblok: als eerste data, status = groovtube
-            lastBreathTimestamp = Date.now();
-            setHeaderStatus('groovtube');
-            if (!breathTimeoutInterval) {
-                breathTimeoutInterval = setInterval(()=>{
-                    if (isConnected) {
-                        if (Date.now() - lastBreathTimestamp > 2000) {
-                            setHeaderStatus('adapter');
-                        }
-                    }
-                }, 500);
-            }
+            handleBreathSample(parseFloat(line.split(':')[1]), Date.now());
         } else if (line.startsWith('SETTINGS::')) {
             try {
                 const json = JSON.parse(line.split('::')[1]);
@@ -273,16 +289,77 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // --- Regels parsen buiten de main thread ---
+    // De worker knipt de binnenkomende bytes in regels en zet BREATH_DATA om
+    // naar getallen; de leeslus hoeft alleen de chunks door te geven en blijft
+    // zo de poort leegtrekken, ook als de pagina het druk heeft.
+    function serialParserWorker() {
+        const decoder = new TextDecoder();
+        let buffer = '';
+        self.onmessage = (event) => {
+            if (event.data === 'reset') {
+                buffer = '';
+                return;
+            }
+            buffer += decoder.decode(event.data, { stream: true });
+            const parts = buffer.split('\n');
+            buffer = parts.pop();
+            const now = Date.now();
+            const values = new Float64Array(parts.length);
+            const times = new Float64Array(parts.length);
+            const lines = [];
+            let count = 0;
+            for (const part of parts) {
+                const line = part.trim();
+                if (line.startsWith('BREATH_DATA:')) {
+                    const val = parseFloat(line.slice(12));
+                    if (!Number.isNaN(val)) {
+                        values[count] = val;
+                        times[count] = now;
+                        count++;
+                    }
+                } else if (line) {
+                    lines.push(line);
+                }
+            }
+            const samples = values.slice(0, count);
+            const stamps = times.slice(0, count);
+            self.postMessage({ values: samples, times: stamps, lines }, [samples.buffer, stamps.buffer]);
+        };
+    }
+
+    let serialParser = null;
+    try {
+        const source = '(' + serialParserWorker.toString() + ')();';
+        serialParser = new Worker(URL.createObjectURL(new Blob([source], { type: 'text/javascript' })));
+        serialParser.onmessage = (event) => {
+            const { values, times, lines } = event.data;
+            for (let i = 0; i < values.length; i++) {
+                handleBreathSample(values[i], times[i]);
+            }
+            for (const line of lines) {
+                handleDeviceLine(line);
+            }
+        };
+    } catch (e) {
+        serialParser = null; // Geen workers beschikbaar: parsen in de leeslus zelf
+    }
+
     async function listenToDevice() {
         try {
             reader = port.readable.getReader();
             let buffer = '';
+            const decoder = new TextDecoder();
+            if (serialParser) serialParser.postMessage('reset');
             while (isConnected) {
                 const { value, done } = await reader.read();
                 if (done) break;
                 if (value) {
-                    const text = new TextDecoder().decode(value);
-                    buffer += text;
+                    if (serialParser) {
+                        serialParser.postMessage(value, [value.buffer]);
+                        continue;
+                    }
+                    buffer += decoder.decode(value, { stream: true });
                     let lines = buffer.split('\n');
                     buffer = lines.pop();
                     for (let line of lines) {
@@ -598,8 +675,18 @@ document.addEventListener('DOMContentLoaded', function() {
         pepRewardLedSettings.style.display = pepRewardType.value === 'led' ? '' : 'none';
         pepRewardGpioSettings.style.display = pepRewardType.value === 'gpio' ? '' : 'none';
     }
-    pepRewardType.addEventListener('change', updatePepRewardSettingsVisibility);
+    pepRewardType.addEventListener('change', () => {
+        updatePepRewardSettingsVisibility();
+        sendSettingUpdate({ 'pep_reward_type': pepRewardType.value });
+    });
     updatePepRewardSettingsVisibility();
+    // GPIO beloningspuls duur direct naar device sturen
+    const pepRewardGpioDuration = document.getElementById('pepRewardGpioDuration');
+    if (pepRewardGpioDuration) {
+        pepRewardGpioDuration.addEventListener('change', () => {
+            sendSettingUpdate({ 'pep_reward_gpio_duration': parseInt(pepRewardGpioDuration.value) });
+        });
+    }
     
     // --- Knoppen dropdowns functioneel maken ---
     ['expiratieButton', 'inspiratieButton'].forEach(id => {
@@ -651,6 +738,15 @@ document.addEventListener('DOMContentLoaded', function() {
             // Zorg dat joystick live dot zichtbaar blijft
             if (joystickLiveDot) joystickLiveDot.style.display = '';
             if (buttonsLiveDot) buttonsLiveDot.style.display = 'none';
+        } else if (controlModeSelect.value === 'hybrid') {
+            // Hybride modus: joystick en knoppen instellingen allebei tonen
+            joystickControls.style.display = '';
+            buttonControls.style.display = '';
+            if (joystickTestSection) joystickTestSection.style.display = '';
+            if (exhaleMarker) exhaleMarker.style.display = '';
+            if (inhaleMarker) inhaleMarker.style.display = '';
+            if (joystickLiveDot) joystickLiveDot.style.display = '';
+            if (buttonsLiveDot) buttonsLiveDot.style.display = '';
         } else {
             joystickControls.style.display = 'none';
             buttonControls.style.display = '';
@@ -726,11 +822,99 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // === MEETLOGICA EN LIVE TABEL/GRAFIEK ===
+
+    // Samples van een meting in groeiende typed arrays (12 bytes per sample).
+    // Bij MAX_SAMPLES wordt de opslag gehalveerd (elke tweede sample) en daarna
+    // nog maar één op de `stride` samples bewaard, zodat het geheugen begrensd blijft.
+    class MeasurementSeries {
+        constructor(capacity = 4096, maxSamples = 1 << 21) {
+            this.maxSamples = maxSamples;
+            this.values = new Float32Array(capacity);
+            this.times = new Float64Array(capacity);
+            this.length = 0;
+            this.stride = 1;
+            this.skipped = 0;
+        }
+        push(val, timestamp) {
+            if (this.stride > 1 && ++this.skipped < this.stride) return;
+            this.skipped = 0;
+            if (this.length === this.values.length) {
+                if (this.length >= this.maxSamples) {
+                    this.compact();
+                } else {
+                    this.grow(Math.min(this.values.length * 2, this.maxSamples));
+                }
+            }
+            this.values[this.length] = val;
+            this.times[this.length] = timestamp;
+            this.length++;
+        }
+        grow(capacity) {
+            const values = new Float32Array(capacity);
+            const times = new Float64Array(capacity);
+            values.set(this.values.subarray(0, this.length));
+            times.set(this.times.subarray(0, this.length));
+            this.values = values;
+            this.times = times;
+        }
+        compact() {
+            let n = 0;
+            for (let i = 0; i < this.length; i += 2, n++) {
+                this.values[n] = this.values[i];
+                this.times[n] = this.times[i];
+            }
+            this.length = n;
+            this.stride *= 2;
+        }
+    }
+
+    // Largest-Triangle-Three-Buckets: `threshold` punten die de vorm van de
+    // reeks behouden; tijd in seconden vanaf de eerste sample.
+    function downsampleLTTB(series, threshold) {
+        const n = series.length;
+        const { values, times } = series;
+        const t0 = n ? times[0] : 0;
+        if (n <= threshold || threshold < 3) {
+            const points = new Array(n);
+            for (let i = 0; i < n; i++) points[i] = { x: (times[i] - t0) / 1000, y: values[i] };
+            return points;
+        }
+        const points = [{ x: 0, y: values[0] }];
+        const bucketSize = (n - 2) / (threshold - 2);
+        let a = 0;
+        for (let b = 0; b < threshold - 2; b++) {
+            // Gemiddelde van de volgende bucket als derde hoekpunt
+            const nextStart = Math.floor((b + 1) * bucketSize) + 1;
+            const nextEnd = Math.min(Math.floor((b + 2) * bucketSize) + 1, n);
+            let avgX = 0, avgY = 0;
+            for (let i = nextStart; i < nextEnd; i++) { avgX += times[i]; avgY += values[i]; }
+            const count = Math.max(1, nextEnd - nextStart);
+            avgX /= count; avgY /= count;
+            const start = Math.floor(b * bucketSize) + 1;
+            const end = Math.floor((b + 1) * bucketSize) + 1;
+            const ax = times[a], ay = values[a];
+            let maxArea = -1, chosen = start;
+            for (let i = start; i < end; i++) {
+                const area = Math.abs((ax - avgX) * (values[i] - ay) - (ax - times[i]) * (avgY - ay));
+                if (area > maxArea) { maxArea = area; chosen = i; }
+            }
+            points.push({ x: (times[chosen] - t0) / 1000, y: values[chosen] });
+            a = chosen;
+        }
+        points.push({ x: (times[n - 1] - t0) / 1000, y: values[n - 1] });
+        return points;
+    }
+
+    const TRACE_POINTS = 600;          // Puntenbudget voor de ademcurve, ongeacht de meetduur
+    const TRACE_REFRESH_MS = 1000;
+
     let measurementActive = false;
-    let measurementData = [];
+    let measurementData = new MeasurementSeries();
     let measurementActions = [];
     let measurementType = 'beide';
     let measurementChart = null;
+    let measurementTraceChart = null;
+    let traceRefreshTimer = null;
     let measurementActionNr = 1;
     const DREMPEL = 0.025;
     
@@ -739,6 +923,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const exportBtn = document.getElementById('exportPDF');
     const tableDiv = document.getElementById('measurementTable');
     const chartCanvas = document.getElementById('measurementChart');
+    const traceCanvas = document.getElementById('measurementTraceChart');
     const summaryDiv = document.getElementById('measurementSummary');
     
     function updateMeasurementCounters() {
@@ -749,15 +934,57 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     function resetMeasurement() {
-        measurementData = [];
+        measurementData = new MeasurementSeries();
         measurementActions = [];
         measurementActionNr = 1;
         tableDiv.innerHTML = '';
         summaryDiv.innerHTML = '';
         if (measurementChart) measurementChart.destroy();
         measurementChart = null;
+        if (measurementTraceChart) measurementTraceChart.destroy();
+        measurementTraceChart = null;
         updateMeasurementCounters();
     }
+
+    const PDF_CHART_PIXEL_RATIO = 2;   // Grafieken in de PDF op 2x resolutie
+
+    // PNG van een grafiek op een vaste pixel ratio; toBase64Image() zelf schaalt niet
+    // (het tweede argument is de encoder kwaliteit, die PNG negeert)
+    function chartImageAtRatio(chart, ratio) {
+        const previous = chart.options.devicePixelRatio;
+        const width = chart.width, height = chart.height;
+        chart.options.devicePixelRatio = ratio;
+        chart.resize(width, height);
+        const image = chart.toBase64Image('image/png');
+        chart.options.devicePixelRatio = previous;
+        chart.resize(width, height);
+        return image;
+    }
+
+    function renderMeasurementTrace() {
+        if (!traceCanvas) return;
+        const points = downsampleLTTB(measurementData, TRACE_POINTS);
+        if (!measurementTraceChart) {
+            measurementTraceChart = new Chart(traceCanvas, {
+                type: 'line',
+                data: { datasets: [{ label: 'Ademcurve', data: points, borderColor: '#607d8b', borderWidth: 1, pointRadius: 0 }] },
+                options: {
+                    responsive: false,
+                    animation: false,
+                    parsing: false,
+                    normalized: true,
+                    plugins: { legend: { display: false } },
+                    scales: {
+                        x: { type: 'linear', title: { display: true, text: 'Tijd (s)' } },
+                        y: { title: { display: true, text: 'Ademhalingswaarde' } }
+                    }
+                }
+            });
+        } else {
+            measurementTraceChart.data.datasets[0].data = points;
+            measurementTraceChart.update('none');
+        }
+    }
     
     function getMeasurementMeta() {
         return {
@@ -768,54 +995,77 @@ document.addEventListener('DOMContentLoaded', function() {
         };
     }
     
+    function measurementTableRow(a, i) {
+        let kleur = a.type === 'inspiratie' ? '#1976d2' : '#f57c00';
+        return `<tr><td>${i+1}</td><td style="color:${kleur};font-weight:bold;">${a.type.charAt(0).toUpperCase()+a.type.slice(1)}</td><td>${a.max.toFixed(3)}</td><td>${a.duration.toFixed(2)}</td></tr>`;
+    }
+
     function renderMeasurementTable() {
         if (measurementActions.length === 0) {
             tableDiv.innerHTML = '<em>Nog geen ademacties gedetecteerd.</em>';
             return;
         }
-        let html = '<table style="width:100%;border-collapse:collapse;text-align:center;">';
-        html += '<tr style="background:#f5f5f5;"><th>#</th><th>Type</th><th>Maximale waarde</th><th>Duur (s)</th></tr>';
-        measurementActions.forEach((a,i) => {
-            let kleur = a.type === 'inspiratie' ? '#1976d2' : '#f57c00';
-            html += `<tr><td>${i+1}</td><td style="color:${kleur};font-weight:bold;">${a.type.charAt(0).toUpperCase()+a.type.slice(1)}</td><td>${a.max.toFixed(3)}</td><td>${a.duration.toFixed(2)}</td></tr>`;
-        });
-        html += '</table>';
-        tableDiv.innerHTML = html;
+        // Alleen de nieuwe rijen toevoegen; de tabel wordt niet opnieuw opgebouwd
+        let table = tableDiv.querySelector('table');
+        if (!table) {
+            tableDiv.innerHTML = '<table style="width:100%;border-collapse:collapse;text-align:center;">' +
+                '<tr style="background:#f5f5f5;"><th>#</th><th>Type</th><th>Maximale waarde</th><th>Duur (s)</th></tr></table>';
+            table = tableDiv.querySelector('table');
+        }
+        let html = '';
+        for (let i = table.rows.length - 1; i < measurementActions.length; i++) {
+            html += measurementTableRow(measurementActions[i], i);
+        }
+        table.insertAdjacentHTML('beforeend', html);
     }
-    
-    function renderMeasurementChart() {
-        if (measurementChart) measurementChart.destroy();
+
+    function measurementChartLabel(a, i) {
+        return `${a.type.charAt(0).toUpperCase()}${a.type.slice(1)} ${i+1}`;
+    }
+
+    function measurementChartValue(a, type, chartType) {
+        if (a.type !== type) return null;
+        // Duur grafiek: Y-as toont de duur in seconden; anders de ademhalingswaarden (origineel gedrag)
+        return chartType === 'duration' ? a.duration : a.max;
+    }
+
+    function measurementChartAxisLabel(chartType) {
+        return chartType === 'duration' ? 'Duur (seconden)' : 'Ademhalingswaarde';
+    }
+
+    // Grafiek één keer aanmaken en daarna alleen bijwerken:
+    // nieuwe acties worden toegevoegd, een ander grafiek type vult de data opnieuw
+    function renderMeasurementChart(rebuildData = false) {
         const chartType = document.getElementById('chartType').value;
-        const labels = measurementActions.map((a,i) => `${a.type.charAt(0).toUpperCase()}${a.type.slice(1)} ${i+1}`);
-        
-        let dataInspiratie, dataExpiratie, yAxisLabel, yAxisConfig;
-        
-        if (chartType === 'duration') {
-            // Duur grafiek: Y-as toont de duur in seconden
-            dataInspiratie = measurementActions.map(a => a.type === 'inspiratie' ? a.duration : null);
-            dataExpiratie = measurementActions.map(a => a.type === 'expiratie' ? a.duration : null);
-            yAxisLabel = 'Duur (seconden)';
-            yAxisConfig = {
-                beginAtZero: true,
-                title: {
-                    display: true,
-                    text: yAxisLabel
-                }
-            };
-        } else {
-            // Waarden grafiek: Y-as toont de ademhalingswaarden (origineel gedrag)
-            dataInspiratie = measurementActions.map(a => a.type === 'inspiratie' ? a.max : null);
-            dataExpiratie = measurementActions.map(a => a.type === 'expiratie' ? a.max : null);
-            yAxisLabel = 'Ademhalingswaarde';
-            yAxisConfig = {
-                beginAtZero: true,
-                title: {
-                    display: true,
-                    text: yAxisLabel
-                }
-            };
+        if (measurementChart) {
+            const data = measurementChart.data;
+            if (rebuildData) {
+                data.labels.length = 0;
+                data.datasets[0].data.length = 0;
+                data.datasets[1].data.length = 0;
+                measurementChart.options.scales.y.title.text = measurementChartAxisLabel(chartType);
+            }
+            for (let i = data.labels.length; i < measurementActions.length; i++) {
+                const a = measurementActions[i];
+                data.labels.push(measurementChartLabel(a, i));
+                data.datasets[0].data.push(measurementChartValue(a, 'inspiratie', chartType));
+                data.datasets[1].data.push(measurementChartValue(a, 'expiratie', chartType));
+            }
+            measurementChart.update('none');
+            return;
         }
-        
+
+        const labels = measurementActions.map(measurementChartLabel);
+        const dataInspiratie = measurementActions.map(a => measurementChartValue(a, 'inspiratie', chartType));
+        const dataExpiratie = measurementActions.map(a => measurementChartValue(a, 'expiratie', chartType));
+        const yAxisConfig = {
+            beginAtZero: true,
+            title: {
+                display: true,
+                text: measurementChartAxisLabel(chartType)
+            }
+        };
+
         measurementChart = new Chart(chartCanvas, {
             type: 'bar',
             data: {
@@ -837,6 +1087,7 @@ document.addEventListener('DOMContentLoaded', function() {
             },
             options: {
                 responsive: false,
+                animation: false,
                 plugins: {
                     legend: { display: true }
                 },
@@ -890,16 +1141,12 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // --- Koppel aan bestaande ademdata ---
-    let origHandleDeviceLine = handleDeviceLine;
-    handleDeviceLine = function(line) {
-        origHandleDeviceLine(line);
+    let origHandleBreathSample = handleBreathSample;
+    handleBreathSample = function(val, timestamp) {
+        origHandleBreathSample(val, timestamp);
         if (!measurementActive) return;
-        if (line.startsWith('BREATH_DATA:')) {
-            const val = parseFloat(line.split(':')[1]);
-            const timestamp = Date.now();
-            measurementData.push({val, timestamp});
-            processBreathValue(val, timestamp);
-        }
+        measurementData.push(val, timestamp);
+        processBreathValue(val, timestamp);
     };
     
     startBtn.addEventListener('click', () => {
@@ -917,6 +1164,9 @@ document.addEventListener('DOMContentLoaded', function() {
         exportBtn.disabled = true;
         // Toon direct een lege grafiek
         renderMeasurementChart();
+        // Ademcurve met een vast puntenbudget, eens per seconde bijgewerkt
+        renderMeasurementTrace();
+        traceRefreshTimer = setInterval(renderMeasurementTrace, TRACE_REFRESH_MS);
     });
     
     stopBtn.addEventListener('click', () => {
@@ -926,6 +1176,9 @@ document.addEventListener('DOMContentLoaded', function() {
             addMeasurementAction(currentAction.type, currentAction.max, (Date.now() - currentAction.startTime)/1000);
             currentAction = null;
         }
+        clearInterval(traceRefreshTimer);
+        traceRefreshTimer = null;
+        renderMeasurementTrace();
         startBtn.disabled = false;
         stopBtn.disabled = true;
         exportBtn.disabled = false;
@@ -954,7 +1207,7 @@ document.addEventListener('DOMContentLoaded', function() {
     chartTypeSelect.addEventListener('change', () => {
         // Herteken de grafiek wanneer het type wordt gewijzigd
         if (measurementActions.length > 0) {
-            renderMeasurementChart();
+            renderMeasurementChart(true);
         }
     });
     
@@ -1144,10 +1397,16 @@ document.addEventListener('DOMContentLoaded', function() {
         y += 10;
         // Chart.js grafiek als afbeelding (hoge resolutie)
         if (measurementChart) {
-            const chartImg = measurementChart.toBase64Image('image/png', 2); // 2x resolutie
+            const chartImg = chartImageAtRatio(measurementChart, PDF_CHART_PIXEL_RATIO);
             doc.addImage(chartImg, 'PNG', left, y, 650, 260);
             y += 270;
         }
+        // Ademcurve (gedownsampled, dus even snel bij een meting van een uur)
+        if (measurementTraceChart) {
+            const traceImg = chartImageAtRatio(measurementTraceChart, PDF_CHART_PIXEL_RATIO);
+            doc.addImage(traceImg, 'PNG', left, y, 650, 130);
+            y += 140;
+        }
         // Lijn
         doc.setDrawColor(220,220,220);
         doc.setLineWidth(1);
@@ -1572,10 +1831,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 settingsExportArea.value = JSON.stringify(settingsCache, null, 2);
             }
                 
-                // Stuur alle instellingen naar het device
-                Object.keys(settings).forEach(key => {
-                    sendCommand('SET:settings::' + JSON.stringify({ [key]: settings[key] }));
-                });
+                // Stuur alle instellingen in één commando naar het device
+                sendCommand('SET:settings::' + JSON.stringify(settings));
                 
                 setStatus(`✅ Backup succesvol geïmporteerd: ${file.name} (${settingKeys.length} instellingen) - UI en device bijgewerkt`, true);
                 showToast(`✅ Backup geïmporteerd: ${file.name} (${settingKeys.length} instellingen)`, 'success');
@@ -1653,10 +1910,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 settingsExportArea.value = JSON.stringify(settingsCache, null, 2);
             }
             
-            // Stuur alle instellingen naar het device
-            Object.keys(settings).forEach(key => {
-                sendCommand('SET:settings::' + JSON.stringify({ [key]: settings[key] }));
-            });
+            // Stuur alle instellingen in één commando naar het device
+            sendCommand('SET:settings::' + JSON.stringify(settings));
             
             setStatus(`✅ Klembord instellingen succesvol geïmporteerd (${settingKeys.length} instellingen) - UI en device bijgewerkt`, true);
             showToast(`✅ Klembord instellingen geïmporteerd (${settingKeys.length} instellingen)`, 'success');